@@ -0,0 +1,281 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Benchmark the searches over generated problems of growing sizes.
+
+Every measure runs in a fresh process, so the peak memory reported is the
+one of a single search. Results are written as JSON and can be compared
+against the results of a previous run, stored as baseline:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --tolerance 0.25
+
+The second run exits with status 1 if any search got slower than the
+baseline by more than the tolerance.
+"""
+import sys
+import json
+import time
+import search
+import argparse
+import parallel
+import platform
+import resource
+import generators
+import collections
+import multiprocessing
+
+
+def _random_graph(size, seed):
+    """Get a random sparse graph with size nodes, without heuristics."""
+    return generators.random_graph(size, seed=seed, max_cost=10), None, None
+
+
+def _grid(size, seed):
+    """Get a square grid with size cells by side, with Manhattan heuristics."""
+    spp = generators.grid(size, size, seed=seed)
+    return (spp, generators.GridHeuristic(size, spp.end),
+            generators.GridHeuristic(size, spp.start))
+
+
+def _sliding_tile(size, seed):
+    """Get an 8-puzzle scrambled by size moves, with Manhattan heuristics."""
+    stp = generators.sliding_tile(3, moves=size, seed=seed)
+    return (stp, generators.ManhattanHeuristic(3),
+            generators.ManhattanHeuristic(3, stp.tiles))
+
+
+# Problem generators, taking a size and a seed, with their default sizes
+SUITES = collections.OrderedDict([
+    ('random_graph', (_random_graph, [1000, 10000, 100000])),
+    ('grid', (_grid, [30, 100, 300])),
+    ('sliding_tile', (_sliding_tile, [10, 20, 30])),
+])
+
+# Searches built from the forward and reverse heuristics of a problem
+SEARCHES = collections.OrderedDict([
+    ('BreadthFirstSearch',
+     lambda h, rh: search.BreadthFirstSearch()),
+    ('DepthFirstSearch',
+     lambda h, rh: search.DepthFirstSearch()),
+    ('BestFirstSearch',
+     lambda h, rh: search.BestFirstSearch(h)),
+    ('IterativeDepthFirstSearch',
+     lambda h, rh: search.IterativeDepthFirstSearch(h)),
+    ('BidirectionalBreadthFirstSearch',
+     lambda h, rh: search.BidirectionalBreadthFirstSearch()),
+    ('BidirectionalBestFirstSearch',
+     lambda h, rh: search.BidirectionalBestFirstSearch(h, rh)),
+    ('IterativeDeepeningAStar',
+     lambda h, rh: search.IterativeDeepeningAStar(h)),
+    ('SimplifiedMemoryBoundedAStar',
+     lambda h, rh: search.SimplifiedMemoryBoundedAStar(h)),
+    ('BoundedBestFirstSearch',
+     lambda h, rh: search.BoundedBestFirstSearch(h)),
+    ('BeamSearch',
+     lambda h, rh: search.BeamSearch(heuristic=h)),
+])
+
+# The distributed search over growing numbers of processes, to compare its
+# times with one another and with BestFirstSearch on machines with as many
+# cores
+for _workers in (1, 2, 4):
+    SEARCHES['HashDistributedSearch%d' % _workers] = \
+        lambda h, rh, workers=_workers: parallel.HashDistributedSearch(
+            h, workers=workers)
+
+try:
+    import graph
+    graph.VectorizedBreadthFirstSearch()
+    SEARCHES['VectorizedBreadthFirstSearch'] = \
+        lambda h, rh: graph.VectorizedBreadthFirstSearch()
+except ImportError:
+    pass
+
+
+def measure(suite, size, name, seed=0, timeout=60):
+    """
+    Time one search on one generated problem, in a new process.
+
+    The status is 'solved', 'unsolved', 'timeout' or the error raised. The
+    peak memory is the maximum resident set size of the process, in
+    kilobytes, and search_memory its growth while searching.
+
+    >>> result = measure('grid', 10, 'BestFirstSearch')
+    >>> result['status'], result['value'], result['expanded'] > 0
+    ('solved', 18.0, True)
+    """
+    receiver, sender = multiprocessing.Pipe(False)
+    process = multiprocessing.Process(
+        target=_measure, args=(sender, suite, size, name, seed, timeout))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {'status': 'crashed'}
+    process.join()
+
+    result.update(suite=suite, size=size, search=name, seed=seed)
+    return result
+
+
+def _measure(connection, suite, size, name, seed, timeout):
+    """Run a measure in the current process and send its result."""
+    generate, _ = SUITES[suite]
+    problem, heuristic, reverse_heuristic = generate(size, seed)
+    searcher = SEARCHES[name](heuristic, reverse_heuristic)
+    stats = search.SearchStats()
+
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    try:
+        solution = searcher.solve(problem, timeout=timeout, stats=stats)
+        status = 'solved' if solution else 'unsolved'
+    except search.TimeoutError:
+        solution = None
+        status = 'timeout'
+    except Exception as error:
+        solution = None
+        status = '%s: %s' % (error.__class__.__name__, error)
+    ellapsed = time.time() - start
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    value = solution.value.value if solution else None
+    connection.send({
+        'status': status,
+        'value': float(value) if isinstance(value, (int, float)) else value,
+        'time': ellapsed,
+        'expanded': stats.expanded,
+        'generated': stats.generated,
+        'expansions_per_second': stats.expanded / ellapsed
+        if ellapsed else None,
+        'peak_memory': peak_memory,
+        'search_memory': peak_memory - memory,
+    })
+    connection.close()
+
+
+def run(suites=None, searches=None, sizes=None, seed=0, repeat=1,
+        timeout=60, report=None):
+    """
+    Measure every search over every size of every suite.
+
+    Each measure is repeated and the fastest one kept. Sizes, if given,
+    replace the default sizes of every suite. Once a search times out on a
+    suite, it is skipped for the bigger sizes. Every result is passed to the
+    report function, if any, as soon as it is measured.
+    """
+    results = []
+    for suite in suites or SUITES:
+        _, default_sizes = SUITES[suite]
+        for name in searches or SEARCHES:
+            for size in sizes or default_sizes:
+                result = min(
+                    (measure(suite, size, name, seed, timeout)
+                     for _ in xrange(repeat)),
+                    key=lambda result: result.get('time', float('inf')))
+
+                results.append(result)
+                if report:
+                    report(result)
+
+                if result['status'] == 'timeout':
+                    break
+
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, min_time=0.01):
+    """
+    Find the results slower than the matching ones in the baseline.
+
+    Results are matched by suite, size, search and seed. A result is slower
+    if it took more than (1 + tolerance) times the baseline time, ignoring
+    baseline times under min_time seconds as noise, or if it was solved in
+    the baseline but not anymore. Return (result, baseline result) pairs.
+
+    >>> old = [{'suite': 'grid', 'size': 30, 'search': 'BFS', 'seed': 0,
+    ...         'status': 'solved', 'time': 1.0}]
+    >>> new = [dict(old[0], time=1.1)]
+    >>> compare(new, old)
+    []
+    >>> new = [dict(old[0], time=1.5)]
+    >>> [result['time'] for result, _ in compare(new, old)]
+    [1.5]
+    >>> new = [dict(old[0], status='timeout', time=0.1)]
+    >>> [result['status'] for result, _ in compare(new, old)]
+    ['timeout']
+    """
+    def key(result):
+        return (result['suite'], result['size'], result['search'],
+                result['seed'])
+
+    known = dict((key(result), result) for result in baseline)
+    slower = []
+    for result in results:
+        old = known.get(key(result))
+        if old is None or old['status'] != 'solved':
+            continue
+
+        if result['status'] != 'solved' or \
+                old['time'] >= min_time and \
+                result['time'] > old['time'] * (1 + tolerance):
+            slower.append((result, old))
+
+    return slower
+
+
+def _print_result(result):
+    """Print a result as a line of a table."""
+    print '%-14s %7s %-32s %-10s %9.4fs %10s/s %8s kB' % (
+        result['suite'], result['size'], result['search'], result['status'],
+        result.get('time', 0), int(result.get('expansions_per_second') or 0),
+        result.get('search_memory', '-'))
+
+
+def main(arguments=None):
+    """Run the benchmark from the command line, return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--suites', nargs='+', choices=list(SUITES))
+    parser.add_argument('--searches', nargs='+', choices=list(SEARCHES))
+    parser.add_argument('--sizes', nargs='+', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help='file to write the results to')
+    parser.add_argument('--baseline', help='results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    options = parser.parse_args(arguments)
+
+    results = run(options.suites, options.searches, options.sizes,
+                  options.seed, options.repeat, options.timeout,
+                  _print_result)
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'results': results,
+            }, output, indent=2, sort_keys=True)
+
+    if options.baseline:
+        with open(options.baseline) as baseline:
+            slower = compare(results, json.load(baseline)['results'],
+                             options.tolerance)
+
+        for result, old in slower:
+            print 'SLOWER %s %s %s: %s in %.4fs, was %s in %.4fs' % (
+                result['suite'], result['size'], result['search'],
+                result['status'], result.get('time', 0), old['status'],
+                old['time'])
+
+        if slower:
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
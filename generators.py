@@ -0,0 +1,279 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Seeded generators of problems, used to test and benchmark searches."""
+import random
+import search
+import problem
+import itertools
+
+
+def random_graph(num_nodes, degree=4, seed=None, max_cost=None):
+    """
+    Get a shortest path problem over a random sparse directed graph.
+
+    Every node gets edges to degree random nodes, plus a chain through all
+    the nodes in random order from the start to the end, so the end is
+    always reachable. Edges cost 1, or a random integer up to max_cost.
+
+    >>> spp = random_graph(50, seed=1)
+    >>> spp.num_nodes, len(spp.neighbours)
+    (50, 249)
+    >>> spp.start == random_graph(50, seed=1).start
+    True
+    >>> a = search.BestFirstSearch().solve(random_graph(50, seed=1))
+    >>> b = search.BreadthFirstSearch().solve(random_graph(50, seed=1))
+    >>> a.value == b.value
+    True
+    """
+    rng = random.Random(seed)
+    order = list(xrange(num_nodes))
+    rng.shuffle(order)
+
+    edges = list(zip(order[:-1], order[1:]))
+    for node in xrange(num_nodes):
+        for _ in xrange(degree):
+            other = rng.randrange(num_nodes - 1)
+            edges.append((node, other + (other >= node)))
+
+    if max_cost:
+        edges = [(start, end, rng.randint(1, max_cost))
+                 for start, end in edges]
+
+    return problem.SparseShortestPathProblem.from_edges(
+        edges, order[0], order[-1], num_nodes)
+
+
+def grid(width, height, obstacles=0.2, seed=None):
+    """
+    Get a shortest path problem over a grid with random obstacles.
+
+    Node y * width + x is the cell at column x and row y, linked to its free
+    neighbours in the four directions. The search goes from the top left to
+    the bottom right cell, and a random staircase path between them is kept
+    free of obstacles, so the problem is always solvable.
+
+    >>> spp = grid(10, 10, obstacles=0.3, seed=2)
+    >>> spp.start, spp.end
+    (0, 99)
+    >>> h = GridHeuristic(10, spp.end)
+    >>> a = search.BestFirstSearch(h).solve(spp)
+    >>> b = search.BreadthFirstSearch().solve(spp)
+    >>> a.value == b.value, a.value.value >= h(spp.initial_state())
+    (True, True)
+    """
+    rng = random.Random(seed)
+    free = [rng.random() >= obstacles for _ in xrange(width * height)]
+
+    x = y = 0
+    free[0] = True
+    while (x, y) != (width - 1, height - 1):
+        if y == height - 1 or x < width - 1 and rng.random() < 0.5:
+            x += 1
+        else:
+            y += 1
+        free[y * width + x] = True
+
+    edges = []
+    for y, x in itertools.product(xrange(height), xrange(width)):
+        node = y * width + x
+        if not free[node]:
+            continue
+
+        if x + 1 < width and free[node + 1]:
+            edges.append((node, node + 1))
+        if y + 1 < height and free[node + width]:
+            edges.append((node, node + width))
+
+    return problem.SparseShortestPathProblem.from_edges(
+        edges, 0, width * height - 1, width * height, directed=False)
+
+
+class GridHeuristic(search.Heuristic):
+    """
+    The Manhattan distance from the cell of a grid to a target cell.
+
+    >>> h = GridHeuristic(10, 99)
+    >>> h(problem.ShortestPathState(0, 0))
+    18
+    """
+
+    def __init__(self, width, target):
+        """Initialize the heuristic with the width of the grid."""
+        self.width = width
+        self.target = divmod(target, width)
+
+    def __call__(self, state):
+        """Evaluate a state."""
+        y, x = divmod(state.index, self.width)
+        return abs(y - self.target[0]) + abs(x - self.target[1])
+
+
+def sliding_tile(width, moves=50, seed=None):
+    """
+    Get a sliding tile puzzle scrambled by random moves from the goal.
+
+    Moves going straight back are skipped, so the solution takes at most the
+    given number of moves.
+
+    >>> stp = sliding_tile(3, moves=10, seed=3)
+    >>> solution = search.BestFirstSearch(ManhattanHeuristic(3)).solve(stp)
+    >>> solution.value.value <= 10, stp.is_solution(solution)
+    (True, True)
+    """
+    rng = random.Random(seed)
+    goal = SlidingTileProblem.goal(width)
+    state = SlidingTileState(goal, 0)
+    stp = SlidingTileProblem(goal, width)
+
+    previous = None
+    for _ in xrange(moves):
+        actions = [action for action in stp.actions(state)
+                   if action.target != previous]
+        previous = state.blank
+        state = rng.choice(actions)(state)
+
+    return SlidingTileProblem(state.tiles, width)
+
+
+class SlidingTileProblem(problem.Problem):
+    """
+    The sliding tile puzzle, over a square board.
+
+    Tiles are numbered from 1 in reading order on the goal board, with 0 the
+    blank in the last cell. Every move slides a tile into the blank.
+
+    >>> stp = SlidingTileProblem((1, 2, 3, 4, 5, 6, 7, 0, 8), 3)
+    >>> stp.initial_state()
+    {tiles: (1, 2, 3, 4, 5, 6, 7, 0, 8), value: 0}
+    >>> search.BreadthFirstSearch().solve(stp)
+    {tiles: (1, 2, 3, 4, 5, 6, 7, 8, 0), value: 1}
+    """
+
+    def __init__(self, tiles, width):
+        """Initialize the puzzle with its board, read row by row."""
+        self.tiles = tuple(tiles)
+        self.width = width
+        self.solved = self.goal(width)
+
+    @staticmethod
+    def goal(width):
+        """Get the solved board of a given width."""
+        return tuple(xrange(1, width * width)) + (0,)
+
+    def initial_state(self):
+        """Return the initial state for the problem."""
+        return SlidingTileState(self.tiles, 0)
+
+    def is_solution(self, state):
+        """Check whether the board is solved."""
+        return state.tiles == self.solved
+
+    def actions(self, state):
+        """Get the moves of the blank to its neighbouring cells."""
+        blank = state.blank
+        y, x = divmod(blank, self.width)
+        targets = []
+        if y > 0:
+            targets.append(blank - self.width)
+        if y < self.width - 1:
+            targets.append(blank + self.width)
+        if x > 0:
+            targets.append(blank - 1)
+        if x < self.width - 1:
+            targets.append(blank + 1)
+
+        return [SlidingTileMove(blank, target) for target in targets]
+
+    def state_key(self, state):
+        """Get a key identifying a state, its board."""
+        return state.tiles
+
+    def goal_states(self):
+        """Return the solved board."""
+        return [SlidingTileState(self.solved, 0)]
+
+    def reverse_actions(self, state):
+        """Get the moves back to the previous boards, the same as forward."""
+        return self.actions(state)
+
+
+class SlidingTileMove(problem.Action):
+    """Move of the blank to a neighbouring cell of the sliding tile puzzle."""
+
+    def __init__(self, blank, target):
+        """Initialize the move from the blank to the target cell."""
+        self.blank = blank
+        self.target = target
+
+    def __call__(self, state):
+        """Slide the tile at the target cell into the blank."""
+        tiles = list(state.tiles)
+        tiles[self.blank] = tiles[self.target]
+        tiles[self.target] = 0
+        return SlidingTileState(tuple(tiles), state._value + 1, self.target)
+
+    def reverse(self):
+        """Get the move back to the previous board."""
+        return SlidingTileMove(self.target, self.blank)
+
+
+class SlidingTileState(problem.State):
+    """A board of the sliding tile puzzle."""
+
+    def __init__(self, tiles, value, blank=None):
+        """Initialize the board, finding the blank unless given."""
+        self.tiles = tiles
+        self._value = value
+        self.blank = tiles.index(0) if blank is None else blank
+
+    def __repr__(self):
+        """String representation of the state."""
+        return "{tiles: %s, value: %s}" % (self.tiles, self._value)
+
+    def __hash__(self):
+        """Get a unique hash for the state, the hash of its board."""
+        return hash(self.tiles)
+
+
+class ManhattanHeuristic(search.Heuristic):
+    """
+    The sum of the Manhattan distances from every tile to its goal cell.
+
+    The goal board defaults to the solved puzzle.
+
+    >>> h = ManhattanHeuristic(3)
+    >>> h(SlidingTileState((1, 2, 3, 4, 5, 6, 7, 0, 8), 0))
+    1
+    >>> h(SlidingTileState((8, 2, 3, 4, 5, 6, 7, 1, 0), 0))
+    6
+    """
+
+    def __init__(self, width, goal=None):
+        """Initialize the heuristic with the width of the board."""
+        goal = goal or SlidingTileProblem.goal(width)
+        self.targets = [None] * len(goal)
+        for cell, tile in enumerate(goal):
+            self.targets[tile] = divmod(cell, width)
+        self.width = width
+
+    def __call__(self, state):
+        """Evaluate a state."""
+        width = self.width
+        targets = self.targets
+        distance = 0
+        for cell, tile in enumerate(state.tiles):
+            if tile:
+                y, x = divmod(cell, width)
+                target_y, target_x = targets[tile]
+                distance += abs(y - target_y) + abs(x - target_x)
+
+        return distance
+
+
+def unit_test():
+    """Test the module."""
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    unit_test()
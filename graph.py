@@ -0,0 +1,880 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Algorithms for search specialised in ShortestPathProblem graphs."""
+import sys
+import json
+import time
+import heapq
+import array
+import random
+import search
+import collections
+from problem import ShortestPathProblem, SparseShortestPathProblem
+from problem import ShortestPathState
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class VectorizedBreadthFirstSearch(search.BreadthFirstSearch):
+    """
+    A level synchronous breadth first search using NumPy.
+
+    Each level expands the whole frontier at once with array operations over
+    a visited mask and a parent array, instead of creating a state and an
+    action per edge. Problems that aren't a ShortestPathProblem, or solves
+    from an explicit initial state, fall back to the regular search.
+    """
+
+    def __init__(self):
+        """Initialize the search, which requires NumPy."""
+        if numpy is None:
+            raise ImportError("VectorizedBreadthFirstSearch requires numpy")
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """
+        Get a solution to the problem.
+
+        Whole levels are expanded at once, so stats only get the counters and
+        the solution, without the expand and generate hooks.
+        """
+        if initial_state is not None or \
+                not isinstance(problem, ShortestPathProblem):
+            return super(VectorizedBreadthFirstSearch, self).solve(
+                problem, initial_state, timeout, stats)
+
+        parents, _ = self.expand(
+            problem, problem.start, problem.end, timeout, stats)
+
+        index = problem.end
+        if parents[index] < 0:
+            return None
+
+        path = [index]
+        while index != problem.start:
+            index = int(parents[index])
+            path.append(index)
+
+        path.reverse()
+        solution = problem.path_state(path)
+        if stats is not None:
+            stats.solution(solution)
+        return solution
+
+    def distances(self, problem, source=None, timeout=None):
+        """
+        Get the number of edges from the source to every node.
+
+        The source defaults to the problem's start; unreachable nodes get -1.
+        """
+        if source is None:
+            source = problem.start
+
+        _, depths = self.expand(problem, source, None, timeout)
+        return depths
+
+    def expand(self, problem, source, target=None, timeout=None,
+               stats=None):
+        """
+        Run the search level by level from the source.
+
+        Stop once the target is reached, if any. Return the parent and depth
+        arrays, both with -1 on nodes that weren't reached.
+        """
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        size = problem.num_nodes
+        visited = numpy.zeros(size, dtype=bool)
+        parents = numpy.full(size, -1, dtype=numpy.int64)
+        depths = numpy.full(size, -1, dtype=numpy.int64)
+
+        visited[source] = True
+        parents[source] = source
+        depths[source] = 0
+
+        if isinstance(problem, SparseShortestPathProblem):
+            offsets = _as_array(problem.offsets)
+            neighbours = _as_array(problem.neighbours)
+            opened = None
+            if problem._closed:
+                opened = numpy.isfinite(_as_array(problem.weights))
+            gather = lambda frontier: _gather_sparse(
+                offsets, neighbours, frontier, opened)
+        else:
+            matrix = numpy.asarray(problem.adjacency_matrix) != 0
+            gather = lambda frontier: _gather_dense(matrix, frontier)
+
+        if stats is not None:
+            stats.phase('setup', start)
+
+        depth = 0
+        seen = 1
+        frontier = numpy.array([source], dtype=numpy.int64)
+        searching = time.time()
+        try:
+            while frontier.size and (target is None or not visited[target]):
+                current = time.time()
+                if current - start > timeout:
+                    raise search.TimeoutError()
+
+                reached, sources = gather(frontier)
+                new = ~visited[reached]
+                generated = reached.size
+                reached, first = numpy.unique(reached[new],
+                                              return_index=True)
+
+                depth += 1
+                visited[reached] = True
+                parents[reached] = sources[new][first]
+                depths[reached] = depth
+
+                if stats is not None:
+                    seen += reached.size
+                    stats.expanded += frontier.size
+                    stats.generated += generated
+                    stats.duplicates += generated - reached.size
+                    stats.peak_frontier = max(stats.peak_frontier,
+                                              reached.size)
+                    stats.peak_seen = max(stats.peak_seen, seen)
+
+                frontier = reached
+        finally:
+            if stats is not None:
+                stats.phase('search', searching)
+
+        return parents, depths
+
+
+class LandmarkTable:
+    """
+    Distances between a few landmark nodes and every node of a graph.
+
+    By the triangle inequality, for every landmark L the distance from node v
+    to node t is at least d(L, t) - d(L, v) and d(v, L) - d(t, L), which gives
+    an admissible and consistent heuristic (ALT). Distances from and to each
+    landmark are kept in arrays of doubles, unreachable nodes at infinity.
+
+    >>> import generators
+    >>> spp = generators.grid(30, 30, seed=1)
+    >>> table = LandmarkTable.build(spp, 4, seed=1)
+    >>> len(table.landmarks)
+    4
+    >>> plain, alt = search.SearchStats(), search.SearchStats()
+    >>> a = search.BestFirstSearch().solve(spp, stats=plain)
+    >>> b = search.BestFirstSearch(table.heuristic(spp.end)).solve(
+    ...     spp, stats=alt)
+    >>> a.value == b.value, alt.expanded < plain.expanded
+    (True, True)
+    """
+
+    def __init__(self, landmarks, forward, backward):
+        """
+        Initialize the table.
+
+        forward[i] holds the distances from landmarks[i] to every node, and
+        backward[i] the distances from every node to it.
+        """
+        self.landmarks = list(landmarks)
+        self.forward = forward
+        self.backward = backward
+
+    @property
+    def num_nodes(self):
+        """Get the number of nodes in the graph."""
+        return len(self.forward[0]) if self.forward else 0
+
+    @classmethod
+    def build(cls, problem, num_landmarks=8, seed=None):
+        """
+        Pick landmarks over the graph of a problem and compute their tables.
+
+        The first landmark is a random node with some edge, every other one
+        the node reachable from the landmarks so far whose distance to the
+        closest of them is the largest (farthest point selection).
+        """
+        size = problem.num_nodes
+        rng = random.Random(seed)
+        candidates = [index for index in xrange(size)
+                      if problem.successors(index) or
+                      problem.predecessors(index)]
+        if not candidates:
+            return cls([], [], [])
+
+        landmark = rng.choice(candidates)
+        landmarks = []
+        forward = []
+        backward = []
+        closest = array.array('d', [float('inf')]) * size
+        while landmark is not None and len(landmarks) < num_landmarks:
+            landmarks.append(landmark)
+            forward.append(_dijkstra(problem.successors, size, landmark))
+            backward.append(_dijkstra(problem.predecessors, size, landmark))
+
+            landmark = None
+            farthest = 0
+            for index, distance in enumerate(forward[-1]):
+                if distance < closest[index]:
+                    closest[index] = distance
+                if farthest < closest[index] < float('inf'):
+                    landmark = index
+                    farthest = closest[index]
+
+        return cls(landmarks, forward, backward)
+
+    def lower_bound(self, node, target):
+        """
+        Get a lower bound of the distance from a node to a target node.
+
+        Terms with infinite distances are skipped.
+
+        >>> spp = ShortestPathProblem([[0, 2, 0], [0, 0, 3], [0, 0, 0]], 0, 2)
+        >>> table = LandmarkTable.build(spp, 1, seed=0)
+        >>> table.lower_bound(0, 2), table.lower_bound(1, 2)
+        (5.0, 3.0)
+        """
+        return self.heuristic(target).bound(node)
+
+    def heuristic(self, target):
+        """Get the landmark heuristic estimating distances to a target."""
+        return LandmarkHeuristic(self, target)
+
+    def save(self, path):
+        """
+        Write the table to a file.
+
+        A line of JSON describing the table is followed by the binary
+        distances, in the native byte order.
+        """
+        with open(path, 'wb') as output:
+            output.write(json.dumps({
+                'num_nodes': self.num_nodes,
+                'landmarks': self.landmarks,
+                'byteorder': sys.byteorder,
+            }) + '\n')
+            for distances in self.forward + self.backward:
+                distances.tofile(output)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a table written by save.
+
+        >>> import os, tempfile
+        >>> spp = ShortestPathProblem([[0, 2, 0], [0, 0, 3], [1, 0, 0]], 0, 2)
+        >>> table = LandmarkTable.build(spp, 2, seed=0)
+        >>> handle, path = tempfile.mkstemp()
+        >>> table.save(path)
+        >>> loaded = LandmarkTable.load(path)
+        >>> os.close(handle); os.remove(path)
+        >>> loaded.landmarks == table.landmarks
+        True
+        >>> loaded.forward == table.forward, loaded.backward == table.backward
+        (True, True)
+        """
+        with open(path, 'rb') as source:
+            header = json.loads(source.readline())
+            if header['byteorder'] != sys.byteorder:
+                raise ValueError("The table was saved with another byte order")
+
+            tables = []
+            for _ in xrange(2 * len(header['landmarks'])):
+                distances = array.array('d')
+                distances.fromfile(source, header['num_nodes'])
+                tables.append(distances)
+
+        count = len(header['landmarks'])
+        return cls(header['landmarks'], tables[:count], tables[count:])
+
+
+class LandmarkHeuristic(search.Heuristic):
+    """The landmark lower bound of the distance to a target node."""
+
+    def __init__(self, table, target):
+        """Initialize the heuristic, picking the target distances once."""
+        self.table = table
+        self.target = target
+        self.terms = [
+            (forward, forward[target], backward, backward[target])
+            for forward, backward in zip(table.forward, table.backward)
+        ]
+
+    def __call__(self, state):
+        """Evaluate a state."""
+        return self.bound(state.index)
+
+    def bound(self, node):
+        """Get the lower bound of the distance from a node to the target."""
+        inf = float('inf')
+        best = 0
+        for forward, to_target, backward, from_target in self.terms:
+            from_landmark = forward[node]
+            if from_landmark < inf and to_target < inf and \
+                    to_target - from_landmark > best:
+                best = to_target - from_landmark
+
+            to_landmark = backward[node]
+            if to_landmark < inf and from_target < inf and \
+                    to_landmark - from_target > best:
+                best = to_landmark - from_target
+
+        return best
+
+
+def _dijkstra(neighbours, size, source):
+    """Get the distances from a source to every node, given the neighbours."""
+    inf = float('inf')
+    distances = array.array('d', [inf]) * size
+    distances[source] = 0
+    queue = [(0, source)]
+    while queue:
+        distance, index = heapq.heappop(queue)
+        if distance > distances[index]:
+            continue
+
+        for other, cost in neighbours(index):
+            new_distance = distance + cost
+            if new_distance < distances[other]:
+                distances[other] = new_distance
+                heapq.heappush(queue, (new_distance, other))
+
+    return distances
+
+
+class ContractionHierarchyQuery(search.BidirectionalBestFirstSearch):
+    """
+    A bidirectional Dijkstra over the upward graph of a hierarchy.
+
+    Use it on the problems given by transformation.ContractionHierarchies.
+    Both searches only go up to nodes of higher rank, so the first meeting
+    isn't the best one: each search goes on until its own queue can't beat
+    the best solution found.
+    """
+
+    def __init__(self):
+        """Initialize the search, without heuristics."""
+        super(ContractionHierarchyQuery, self).__init__()
+
+    def done(self, forward_top, backward_top, best_value):
+        """Check whether both queues can't improve on the best solution."""
+        return (forward_top is None or forward_top >= best_value) and \
+            (backward_top is None or backward_top >= best_value)
+
+
+class LifelongPlanningAStar(search.Search):
+    """
+    An incremental A* over the nodes of a ShortestPathProblem (LPA*).
+
+    The distance g from the start to every node expanded, and its one step
+    lookahead rhs, are kept between solves. After edges change through
+    update_edge, the next solve only repairs the nodes whose distance
+    changed, instead of searching again from scratch. Solving another
+    problem, from another start or to another end, or after the graph was
+    changed some other way starts over.
+
+    The heuristic must be consistent to ensure an optimal solution.
+
+    >>> spp = ShortestPathProblem([
+    ...     [0, 1, 0, 0, 9], [0, 0, 1, 0, 0], [0, 0, 0, 1, 0],
+    ...     [0, 0, 0, 0, 1], [0, 0, 0, 0, 0]], 0, 4)
+    >>> lpa = LifelongPlanningAStar()
+    >>> lpa.solve(spp)
+    {index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+    >>> lpa.update_edge(2, 3, 0)
+    >>> stats = search.SearchStats()
+    >>> lpa.solve(spp, stats=stats)
+    {index: 4, value: 9, path: [0, 4]}
+    >>> stats.expanded
+    3
+
+    Changes made through another problem over the same graph are seen too:
+
+    >>> other = ShortestPathProblem(spp.adjacency_matrix, 0, 4)
+    >>> other.set_edge(2, 3, 1)
+    >>> other.set_edge(1, 2, 0)
+    >>> lpa.update_edge(0, 4, 8)
+    >>> lpa.solve(spp)
+    {index: 4, value: 8, path: [0, 4]}
+    >>> other.set_edge(1, 2, 1)
+    >>> lpa.solve(spp)
+    {index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+    """
+
+    optimal = True
+
+    def __init__(self, heuristic=None):
+        """Initialize the search with an heuristic, zero by default."""
+        self.heuristic = heuristic or search.ZeroHeuristic()
+        self.problem = None
+        self._goal = None
+        self._version = None
+
+    def update_edge(self, start, end, cost):
+        """
+        Change the cost of an edge of the problem, and plan around it.
+
+        The problem is the one last solved. If its graph was changed some
+        other way since, the next solve starts over.
+
+        >>> LifelongPlanningAStar().update_edge(0, 1, 2)
+        Traceback (most recent call last):
+        ...
+        ValueError: No problem to update, solve one first
+        """
+        if self.problem is None:
+            raise ValueError("No problem to update, solve one first")
+
+        version = self.problem.version
+        self.problem.set_edge(start, end, cost)
+        if self._version == version:
+            self._version = self.problem.version
+            self._update(end)
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """Get a solution to the problem, reusing the previous search."""
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        source = problem.start if initial_state is None \
+            else initial_state.index
+        if problem is not self.problem or \
+                (source, problem.end) != self._goal or \
+                problem.version != self._version:
+            self._reset(problem, source)
+
+        if stats is not None:
+            stats.phase('setup', start)
+
+        searching = time.time()
+        try:
+            self._search(start, timeout, stats)
+        finally:
+            if stats is not None:
+                stats.phase('search', searching)
+
+        inf = float('inf')
+        g = self.g
+        if g.get(problem.end, inf) == inf:
+            return None
+
+        # Walk back through the predecessors on a shortest path
+        path = [problem.end]
+        while path[-1] != source:
+            path.append(min(
+                (edge for edge in problem.predecessors(path[-1])
+                 if g.get(edge[0], inf) != inf),
+                key=lambda edge: g[edge[0]] + edge[1])[0])
+
+        path.reverse()
+        solution = problem.path_state(path)
+        if stats is not None:
+            stats.solution(solution)
+        return solution
+
+    def _reset(self, problem, source):
+        """Forget the previous search and start one from the source node."""
+        self.problem = problem
+        self._goal = (source, problem.end)
+        self._version = problem.version
+        self.g = {}
+        self.rhs = {source: 0}
+        self.queue = []
+        self.queued = {}
+        self._push(source)
+
+    def _key(self, node):
+        """Get the priority of a node in the queue."""
+        value = min(self.g.get(node, float('inf')),
+                    self.rhs.get(node, float('inf')))
+        return (value + self.heuristic(ShortestPathState(node, 0)), value)
+
+    def _push(self, node):
+        """Queue a node, outdating its previous entry if any."""
+        key = self._key(node)
+        self.queued[node] = key
+        heapq.heappush(self.queue, (key, node))
+
+    def _update(self, node):
+        """Compute the lookahead of a node, and queue it if inconsistent."""
+        if node != self._goal[0]:
+            inf = float('inf')
+            g = self.g
+            self.rhs[node] = min([
+                g.get(other, inf) + cost
+                for other, cost in self.problem.predecessors(node)
+            ] or [inf])
+
+        if self.g.get(node, float('inf')) != \
+                self.rhs.get(node, float('inf')):
+            self._push(node)
+        else:
+            self.queued.pop(node, None)
+
+    def _search(self, start, timeout, stats):
+        """Expand inconsistent nodes until the end's distance is known."""
+        inf = float('inf')
+        end = self.problem.end
+        g = self.g
+        rhs = self.rhs
+        queue = self.queue
+        queued = self.queued
+        while True:
+            # Lazy deletion: skip entries of nodes queued again or removed
+            while queue and queued.get(queue[0][1]) != queue[0][0]:
+                heapq.heappop(queue)
+
+            if not queue or (queue[0][0] >= self._key(end) and
+                             rhs.get(end, inf) == g.get(end, inf)):
+                return
+
+            if time.time() - start > timeout:
+                raise search.TimeoutError()
+
+            _, node = heapq.heappop(queue)
+            del queued[node]
+
+            successors = self.problem.successors(node)
+            if g.get(node, inf) > rhs.get(node, inf):
+                g[node] = rhs[node]
+            else:
+                g[node] = inf
+                self._update(node)
+
+            for other, _ in successors:
+                self._update(other)
+
+            if stats is not None:
+                for other, cost in successors:
+                    stats.generate(ShortestPathState(
+                        other, g[node] + cost))
+                stats.expand(ShortestPathState(node, g[node]), len(queued),
+                             len(g))
+
+
+class ShortestPathTreeCache(search.Search):
+    """
+    Dijkstra trees from each source, kept to answer later queries.
+
+    Queries from a source already searched are answered at once if their
+    end was settled, and otherwise resume the paused search of the tree
+    until it settles the end. Trees are kept for the least recently used
+    sources within a budget of nodes stored, counting every node reached,
+    and all of them are dropped once the graph changes.
+
+    >>> spp = ShortestPathProblem([
+    ...     [0, 1, 0, 0, 9], [0, 0, 1, 0, 0], [0, 0, 0, 1, 0],
+    ...     [0, 0, 0, 0, 1], [0, 0, 0, 0, 0]], 0, 2)
+    >>> trees = ShortestPathTreeCache()
+    >>> trees.solve(spp)
+    {index: 2, value: 2, path: [0, 1, 2]}
+    >>> stats = search.SearchStats()
+    >>> spp.end = 1
+    >>> trees.solve(spp, stats=stats), stats.expanded
+    ({index: 1, value: 1, path: [0, 1]}, 0)
+    >>> spp.end = 4
+    >>> trees.solve(spp, stats=stats), stats.expanded
+    ({index: 4, value: 4, path: [0, 1, 2, 3, 4]}, 2)
+    >>> other = ShortestPathProblem(spp.adjacency_matrix, 1, 4)
+    >>> other.set_edge(0, 4, 2)
+    >>> trees.solve(spp)
+    {index: 4, value: 2, path: [0, 4]}
+    """
+
+    optimal = True
+
+    def __init__(self, max_nodes=1000000):
+        """Initialize the cache with a budget of nodes stored."""
+        self.max_nodes = max_nodes
+        self.trees = collections.OrderedDict()
+        self.stored = 0
+        self._graph = None
+        self._version = None
+
+    def clear(self):
+        """Drop every tree."""
+        self.trees.clear()
+        self.stored = 0
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """Get a solution to the problem, from the tree of its start."""
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        graph = problem.graph()
+        if self._graph is None or len(graph) != len(self._graph) or \
+                any(a is not b for a, b in zip(graph, self._graph)) or \
+                problem.version != self._version:
+            self.clear()
+            self._graph = graph
+            self._version = problem.version
+
+        source = problem.start if initial_state is None \
+            else initial_state.index
+        tree = self.trees.pop(source, None)
+        if tree is None:
+            tree = _ShortestPathTree(source)
+        else:
+            self.stored -= len(tree.distances)
+
+        # Keep the tree as the most recently used even on timeout
+        self.trees[source] = tree
+        try:
+            if problem.end not in tree.settled:
+                self._resume(problem, tree, start, timeout, stats)
+        finally:
+            self.stored += len(tree.distances)
+            while self.stored > self.max_nodes and len(self.trees) > 1:
+                _, evicted = self.trees.popitem(last=False)
+                self.stored -= len(evicted.distances)
+
+            if stats is not None:
+                stats.phase('search', start)
+
+        if problem.end not in tree.settled:
+            return None
+
+        path = [problem.end]
+        while path[-1] != source:
+            path.append(tree.parents[path[-1]])
+
+        path.reverse()
+        solution = problem.path_state(path)
+        if stats is not None:
+            stats.solution(solution)
+        return solution
+
+    def _resume(self, problem, tree, start, timeout, stats):
+        """Go on with the search of a tree until the end is settled."""
+        distances = tree.distances
+        parents = tree.parents
+        settled = tree.settled
+        queue = tree.queue
+        end = problem.end
+        while queue:
+            if time.time() - start > timeout:
+                raise search.TimeoutError()
+
+            distance, node = queue[0]
+            if node in settled:
+                heapq.heappop(queue)
+                continue
+
+            if stats is not None:
+                stats.expand(ShortestPathState(node, distance), len(queue),
+                             len(distances))
+
+            successors = problem.successors(node)
+            settled.add(node)
+            heapq.heappop(queue)
+            for other, cost in successors:
+                new_distance = distance + cost
+                new = new_distance < distances.get(other, float('inf'))
+                if new:
+                    distances[other] = new_distance
+                    parents[other] = node
+                    heapq.heappush(queue, (new_distance, other))
+
+                if stats is not None:
+                    stats.generate(ShortestPathState(other, new_distance),
+                                   new)
+
+            if node == end:
+                return
+
+
+class KShortestPaths(search.Search):
+    """
+    The loopless paths of a ShortestPathProblem, in cost order (Yen).
+
+    Each path after the first is the cheapest deviation from the paths
+    already found: it follows one of them up to some node, then the shortest
+    path to the end avoiding the edges they take next from there. Paths are
+    only computed as they are consumed.
+
+    >>> import itertools
+    >>> spp = ShortestPathProblem([
+    ...     [0, 1, 0, 0, 9], [0, 0, 1, 0, 4], [0, 0, 0, 1, 0],
+    ...     [0, 0, 0, 0, 1], [0, 0, 0, 0, 0]], 0, 4)
+    >>> for path in KShortestPaths().solve_iter(spp):
+    ...     print path
+    {index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+    {index: 4, value: 5, path: [0, 1, 4]}
+    {index: 4, value: 9, path: [0, 4]}
+    >>> list(itertools.islice(KShortestPaths().solve_iter(spp), 1))
+    [{index: 4, value: 4, path: [0, 1, 2, 3, 4]}]
+    """
+
+    optimal = True
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """Get the shortest path."""
+        return next(self.solve_iter(problem, initial_state, timeout, stats),
+                    None)
+
+    def solve_iter(self, problem, initial_state=None, timeout=None,
+                   stats=None):
+        """Yield the paths from the start to the end by increasing cost."""
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        source = problem.start if initial_state is None \
+            else initial_state.index
+        first = self._shortest_path(problem, source, set(), set(), start,
+                                    timeout, stats)
+        if first is None:
+            return
+
+        found = [first[1]]
+        candidates = []
+        known = set([tuple(first[1])])
+        while True:
+            path = found[-1]
+            solution = problem.path_state(path)
+            if stats is not None:
+                stats.solution(solution)
+            yield solution
+
+            # Deviate from the last path at each of its nodes
+            root_cost = 0
+            for index, spur in enumerate(path[:-1]):
+                root = path[:index + 1]
+                removed_edges = set(
+                    (other[index], other[index + 1]) for other in found
+                    if other[:index + 1] == root)
+                spur_path = self._shortest_path(
+                    problem, spur, set(root[:-1]), removed_edges, start,
+                    timeout, stats)
+
+                if spur_path is not None:
+                    cost, nodes = spur_path
+                    candidate = tuple(root[:-1] + nodes)
+                    if candidate not in known:
+                        known.add(candidate)
+                        heapq.heappush(candidates,
+                                       (root_cost + cost, candidate))
+
+                root_cost += min(cost for other, cost in
+                                 problem.successors(spur)
+                                 if other == path[index + 1])
+
+            if not candidates:
+                return
+
+            _, path = heapq.heappop(candidates)
+            found.append(list(path))
+
+    def _shortest_path(self, problem, source, removed_nodes, removed_edges,
+                       start, timeout, stats):
+        """Get the cost and nodes of the shortest path avoiding some parts."""
+        distances = {source: 0}
+        parents = {}
+        queue = [(0, source)]
+        end = problem.end
+        while queue:
+            if time.time() - start > timeout:
+                raise search.TimeoutError()
+
+            distance, node = heapq.heappop(queue)
+            if distance > distances[node]:
+                continue
+
+            if node == end:
+                path = [end]
+                while path[-1] != source:
+                    path.append(parents[path[-1]])
+
+                path.reverse()
+                return distance, path
+
+            successors = problem.successors(node)
+            if stats is not None:
+                stats.expand(ShortestPathState(node, distance), len(queue),
+                             len(distances))
+
+            for other, cost in successors:
+                if other in removed_nodes or (node, other) in removed_edges:
+                    continue
+
+                new_distance = distance + cost
+                if new_distance < distances.get(other, float('inf')):
+                    distances[other] = new_distance
+                    parents[other] = node
+                    heapq.heappush(queue, (new_distance, other))
+
+        return None
+
+
+class _ShortestPathTree(object):
+    """A paused Dijkstra search kept by ShortestPathTreeCache."""
+
+    __slots__ = ('distances', 'parents', 'settled', 'queue')
+
+    def __init__(self, source):
+        """Initialize the search from a source node."""
+        self.distances = {source: 0}
+        self.parents = {}
+        self.settled = set()
+        self.queue = [(0, source)]
+
+
+def _as_array(values):
+    """Get a NumPy view of a CSR array, without copying array.array data."""
+    if isinstance(values, array.array):
+        return numpy.frombuffer(values, dtype=numpy.dtype(values.typecode))
+
+    return numpy.asarray(values)
+
+
+def _gather_sparse(offsets, neighbours, frontier, opened=None):
+    """
+    Get every (neighbour, source) edge leaving the frontier of a CSR.
+
+    Only the edges whose entry is true in opened are kept, if given.
+    """
+    begins = offsets[frontier]
+    counts = offsets[frontier + 1] - begins
+    ends = numpy.cumsum(counts)
+    indices = numpy.arange(ends[-1]) + numpy.repeat(begins - ends + counts,
+                                                    counts)
+    sources = numpy.repeat(frontier, counts)
+    if opened is not None:
+        kept = opened[indices]
+        indices = indices[kept]
+        sources = sources[kept]
+
+    return neighbours[indices], sources
+
+
+def _gather_dense(matrix, frontier):
+    """Get every (neighbour, source) edge leaving the frontier of a matrix."""
+    rows, columns = numpy.nonzero(matrix[frontier])
+    return columns, frontier[rows]
+
+
+# Examples needing NumPy, only tested if it's installed
+__test__ = {}
+if numpy is not None:
+    __test__['VectorizedBreadthFirstSearch'] = """
+    >>> spp = ShortestPathProblem(
+    ...     [[0, 1, 0, 0], [0, 0, 1, 1], [0, 0, 0, 0], [1, 0, 0, 0]], 0, 2)
+    >>> vbfs = VectorizedBreadthFirstSearch()
+    >>> vbfs.solve(spp)
+    {index: 2, value: 2, path: [0, 1, 2]}
+    >>> list(vbfs.distances(spp))
+    [0, 1, 2, 2]
+    """
+
+
+def unit_test():
+    """Test the module."""
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    unit_test()
@@ -0,0 +1,795 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Drivers running searches over several processes."""
+import six
+import math
+import time
+import utils
+import random
+import search
+import multiprocessing
+from problem import value_getter, value_operations
+
+# Arguments shared by all the tasks of a pool, set once per worker process
+_shared = {}
+
+# Seconds waited between checks of the pending results of a pool
+_POLL_INTERVAL = 0.01
+
+# Seconds waited after a deadline for the results of searches stopping at it
+_GRACE_PERIOD = 0.5
+
+
+def solve_many(searcher, problems, workers=None, timeout=None, chunksize=1):
+    """
+    Solve many problems with the same search over a pool of processes.
+
+    Yield (index, solution) pairs as soon as each problem is done, where index
+    is the position of the problem in the given sequence. Problems that take
+    longer than the timeout yield the TimeoutError raised instead.
+
+    The search and the problems are handed to each worker only once when it
+    starts (inherited on fork, or pickled once with shared graphs pickled a
+    single time otherwise), and tasks only send indices, in chunks.
+
+    >>> import problem
+    >>> matrix = [[0, 1, 0], [0, 0, 1], [1, 0, 0]]
+    >>> problems = [problem.ShortestPathProblem(matrix, start, 2)
+    ...             for start in range(3)]
+    >>> for index, solution in sorted(solve_many(
+    ...         search.BreadthFirstSearch(), problems, workers=2)):
+    ...     print index, solution
+    0 {index: 2, value: 2, path: [0, 1, 2]}
+    1 {index: 2, value: 1, path: [1, 2]}
+    2 {index: 2, value: 0, path: [2]}
+    """
+    problems = list(problems)
+    pool = multiprocessing.Pool(
+        workers, _initialize_worker, (searcher, problems, timeout))
+
+    try:
+        for result in pool.imap_unordered(
+                _solve, xrange(len(problems)), chunksize):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class PortfolioSearch(search.Search):
+    """
+    Race several searches on the same problem, each in its own process.
+
+    The first solution of an optimal search is returned right away, else the
+    best solution once every search is done or at the timeout. The remaining
+    processes are terminated as soon as the result is known.
+
+    >>> import problem
+    >>> matrix = [[0, 1, 0, 9], [0, 0, 1, 0], [0, 0, 0, 1], [0, 0, 0, 0]]
+    >>> spp = problem.ShortestPathProblem(matrix, 0, 3)
+    >>> portfolio = PortfolioSearch([
+    ...     search.BreadthFirstSearch(), search.BestFirstSearch()])
+    >>> portfolio.solve(spp)
+    {index: 3, value: 3, path: [0, 1, 2, 3]}
+
+    Searches whose process dies without a result count as failed:
+
+    >>> import os
+    >>> class Crashing(search.BestFirstSearch):
+    ...     def solve(self, *args, **kwargs):
+    ...         os._exit(1)
+    >>> PortfolioSearch([Crashing(), search.BreadthFirstSearch()]).solve(spp)
+    {index: 3, value: 9, path: [0, 3]}
+    """
+
+    def __init__(self, searches):
+        """Initialize the portfolio with the searches to race."""
+        self.searches = list(searches)
+        self.optimal = any(searcher.optimal for searcher in self.searches)
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """
+        Get a solution to the problem.
+
+        The searches run in other processes, so stats only get the time spent
+        and the solution.
+        """
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_race,
+                args=(results, index, searcher, problem, initial_state,
+                      timeout))
+            for index, searcher in enumerate(self.searches)
+        ]
+
+        def receive():
+            # Wake up now and then to notice workers dying without a result
+            while True:
+                remaining = timeout - (time.time() - start)
+                if remaining <= 0:
+                    return None
+
+                dead = [index for index, process in enumerate(processes)
+                        if index not in reported and
+                        process.exitcode is not None]
+                try:
+                    return results.get(True, min(remaining, _POLL_INTERVAL))
+                except six.moves.queue.Empty:
+                    pass
+
+                # Results put before exiting are read before giving up on them
+                if dead:
+                    return dead[0], RuntimeError("A search worker failed")
+
+        best_solution = None
+        pending = len(processes)
+        reported = set()
+        try:
+            for process in processes:
+                process.daemon = True
+                process.start()
+
+            while pending:
+                result = receive()
+                if result is None:
+                    break
+
+                index, solution = result
+                reported.add(index)
+                pending -= 1
+                if solution is None or isinstance(solution, Exception):
+                    continue
+
+                if not best_solution or solution.value < best_solution.value:
+                    best_solution = solution
+
+                if self.searches[index].optimal:
+                    break
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+                process.join()
+
+            if stats is not None:
+                stats.phase('search', start)
+
+        if not best_solution:
+            if pending:
+                raise search.TimeoutError()
+
+            return None
+
+        if stats is not None:
+            stats.solution(best_solution)
+        return best_solution
+
+
+def _race(results, index, searcher, problem, initial_state, timeout):
+    """Run one search of a portfolio and report its result."""
+    try:
+        solution = searcher.solve(problem, initial_state, timeout=timeout)
+    except Exception as error:
+        solution = error
+
+    results.put((index, solution))
+
+
+class HashDistributedSearch(search.BestFirstSearch):
+    """
+    A* distributed over processes by the hash of the states (HDA*).
+
+    Each worker owns the states whose key hashes to it and keeps their open
+    and closed lists. States generated for another worker are sent to it in
+    batches, cut from their history: only the state itself, the key of its
+    parent and the action between them go, so messages don't grow with the
+    depth. The path of the solution is rebuilt at the end by asking the
+    owners of its states for these links.
+
+    Workers drop states that can't improve on the best solution found so
+    far, and the search only ends once every worker is idle and no batch is
+    in flight, so the solution is optimal given an admissible heuristic.
+    State values must be numbers.
+
+    It only pays off with several cores and costly expansions: each state
+    sent gets pickled, and workers expand more states than A* does, as the
+    states of a same value are spread over all of them. benchmark.py times
+    it over 1, 2 and 4 workers.
+
+    >>> import problem
+    >>> matrix = [[0, 1, 0, 9], [0, 0, 1, 0], [0, 0, 0, 1], [0, 0, 0, 0]]
+    >>> spp = problem.ShortestPathProblem(matrix, 0, 3)
+    >>> HashDistributedSearch(workers=2).solve(spp)
+    {index: 3, value: 3, path: [0, 1, 2, 3]}
+    """
+
+    def __init__(self, heuristic=None, workers=None, batch_size=64):
+        """
+        Initialize the search.
+
+        The number of workers defaults to the number of cores, and generated
+        states are sent to their owners in batches of up to batch_size.
+        """
+        super(HashDistributedSearch, self).__init__(heuristic)
+        self.workers = workers or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """
+        Get a solution to the problem.
+
+        The states are expanded in other processes, so stats only get the
+        number of expansions, the time spent and the solution.
+        """
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        initial_state = initial_state or problem.initial_state()
+        workers = self.workers
+        key = problem.state_key
+
+        # Termination is detected by the last worker going idle, on a
+        # consistent snapshot of these counters guarded by the same lock:
+        # every worker is idle and every batch sent, including the initial
+        # state sent from here, was received.
+        lock = multiprocessing.Lock()
+        sent = multiprocessing.RawArray('l', workers + 1)
+        received = multiprocessing.RawArray('l', workers)
+        idle = multiprocessing.RawArray('b', workers)
+        expansions = multiprocessing.RawArray('l', workers)
+        found = multiprocessing.RawValue('l', 0)
+        bound = multiprocessing.RawValue('d', float('inf'))
+        inboxes = [multiprocessing.Queue() for _ in xrange(workers)]
+        results = multiprocessing.Queue()
+        sent[workers] = 1
+
+        processes = [
+            multiprocessing.Process(
+                target=_distributed_worker,
+                args=(self, index, problem, initial_state.detached(),
+                      inboxes, results, lock, sent, received, idle,
+                      expansions, found, bound))
+            for index in xrange(workers)
+        ]
+
+        def receive():
+            while True:
+                remaining = timeout - (time.time() - start)
+                if remaining <= 0:
+                    raise search.TimeoutError()
+
+                try:
+                    # Wake up now and then to notice failed workers
+                    return results.get(True, min(remaining, 1.0))
+                except six.moves.queue.Empty:
+                    pass
+
+                if any(process.exitcode for process in processes):
+                    raise RuntimeError("A search worker failed")
+
+        best = None
+        best_solution = None
+        try:
+            for process in processes:
+                process.daemon = True
+                process.start()
+
+            inboxes[hash(key(initial_state)) % workers].put(
+                ('states', [(initial_state.detached(), None, None)]))
+
+            # Solutions might arrive after the end is reported
+            collected = 0
+            solutions = None
+            while solutions is None or collected < solutions:
+                message = receive()
+                if message[0] == 'done':
+                    solutions = message[1]
+                else:
+                    collected += 1
+                    _, value, state_key = message
+                    if best is None or value < best[0]:
+                        best = (value, state_key)
+
+            if best is not None:
+                # Follow the links back to the initial state, then replay
+                # the actions from it
+                actions = []
+                state_key = best[1]
+                while state_key is not None:
+                    inboxes[hash(state_key) % workers].put(
+                        ('path', state_key))
+                    _, segment, state_key = receive()
+                    actions.extend(segment)
+
+                best_solution = initial_state
+                for action in reversed(actions):
+                    best_solution = self.generate(best_solution, action)
+        finally:
+            for inbox in inboxes:
+                inbox.put(('stop', None))
+
+            for process in processes:
+                process.join(1)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+
+            if stats is not None:
+                stats.expanded += sum(expansions)
+                stats.phase('search', start)
+
+        if stats is not None and best_solution:
+            stats.solution(best_solution)
+        return best_solution
+
+
+def _distributed_worker(searcher, index, problem, initial_state, inboxes,
+                        results, lock, sent, received, idle, expansions,
+                        found, bound):
+    """
+    Search the states owned by one worker of a HashDistributedSearch.
+
+    The initial state given only tells how to read the values of states,
+    the search starts once it gets to the inbox of its owner.
+
+    The inbox gets ('states', batch) messages of (state, parent key, action)
+    triples, ('path', key) requests answered with the actions leading to
+    the best state of that key from the key of the state sent by another
+    worker it descends from (None for the initial state), and ('stop', None)
+    last. The results get ('solution', value, key) messages, and ('done',
+    solutions found) once the search is over.
+    """
+    for inbox in inboxes:
+        # Batches left in flight once the search is over can be dropped
+        inbox.cancel_join_thread()
+
+    workers = len(inboxes)
+    inbox = inboxes[index]
+    outboxes = [[] for _ in xrange(workers)]
+    queue = searcher.create_queue()
+    key = problem.state_key
+    heuristic = searcher.heuristic
+    value = value_getter(initial_state)
+    best = {}
+
+    # The parent key and action of the states received, by their id
+    origins = {}
+
+    def offer(state, parent_key=None, action=None):
+        state_key = key(state)
+        known = best.get(state_key)
+        if known is None or value(state) < value(known):
+            best[state_key] = state
+            if action is not None:
+                origins[id(state)] = (state, parent_key, action)
+            searcher.push(queue, state, value(state) + heuristic(state))
+
+    def send(owner):
+        with lock:
+            sent[index] += 1
+        inboxes[owner].put(('states', outboxes[owner]))
+        outboxes[owner] = []
+
+    def path(state_key):
+        actions = []
+        state = best[state_key]
+        while state._action is not None:
+            actions.append(state._action)
+            state = state._parent
+
+        origin = origins.get(id(state))
+        if origin is None:
+            results.put(('path', actions, None))
+        else:
+            _, parent_key, action = origin
+            actions.append(action)
+            results.put(('path', actions, parent_key))
+
+    while True:
+        messages = []
+        try:
+            if idle[index]:
+                messages.append(inbox.get())
+
+            while True:
+                messages.append(inbox.get_nowait())
+        except six.moves.queue.Empty:
+            pass
+
+        batches = sum(1 for kind, _ in messages if kind == 'states')
+        if batches:
+            with lock:
+                received[index] += batches
+                idle[index] = 0
+
+        for kind, content in messages:
+            if kind == 'states':
+                for state, parent_key, action in content:
+                    offer(state, parent_key, action)
+            elif kind == 'path':
+                path(content)
+            else:
+                return
+
+        expanded = 0
+        while len(queue) and expanded < searcher.batch_size:
+            estimate, state = queue.pop()
+            state_key = key(state)
+            if best[state_key] is not state or estimate >= bound.value:
+                continue
+
+            if problem.is_solution(state):
+                with lock:
+                    if value(state) < bound.value:
+                        bound.value = value(state)
+                        found.value += 1
+                        results.put(('solution', bound.value, state_key))
+                continue
+
+            expanded += 1
+            expansions[index] += 1
+            for branched_state in searcher.branch(problem, state):
+                owner = hash(key(branched_state)) % workers
+                if owner == index:
+                    offer(branched_state)
+                else:
+                    outboxes[owner].append((
+                        branched_state.detached(), state_key,
+                        branched_state._action))
+                    if len(outboxes[owner]) >= searcher.batch_size:
+                        send(owner)
+
+        # Hand the rest over after every round, so others don't starve
+        for owner in xrange(workers):
+            if outboxes[owner]:
+                send(owner)
+
+        if not len(queue) and not idle[index]:
+            with lock:
+                idle[index] = 1
+                if all(idle) and sum(sent) == sum(received):
+                    results.put(('done', found.value))
+
+
+class ParallelTempering(search.Search):
+    """
+    Simulated annealing chains at fixed temperatures, one per process.
+
+    Hot chains wander over the states while cold ones descend. Every few
+    steps the chains report the value of their current state, and chains of
+    neighbouring temperatures swap them with the replica exchange
+    probability, so good states found by hot chains get refined by cold
+    ones. Swapping temperatures is the same as swapping states, and only
+    needs values to go between processes. The best state of all chains is
+    returned once every chain ran its steps, or at the timeout. State values
+    must be numbers.
+
+    >>> import problem
+    >>> spp = problem.ShortestPathProblem([
+    ...     [0, -1, -3], [0, 0, -5], [0, 0, 0]], 0, 2)
+    >>> ParallelTempering(chains=2, seed=1).solve(spp).value in (-3, -6)
+    True
+    """
+
+    def __init__(self, chains=None, schedule=utils.exp_schedule(lam=0.05),
+                 max_steps=10000, swap_interval=100, seed=None):
+        """
+        Initialize the search.
+
+        The number of chains defaults to the number of cores, and their
+        temperatures are spread over the schedule. Each chain runs up to
+        max_steps steps, reporting back every swap_interval steps. Chains
+        are seeded from seed, if given.
+        """
+        self.chains = chains or multiprocessing.cpu_count()
+        self.temperatures = utils.schedule_ladder(schedule, self.chains)
+        self.max_steps = max_steps
+        self.swap_interval = swap_interval
+        self.seed = seed
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """
+        Get the best state found by the chains.
+
+        The chains run in other processes, so stats only get the number of
+        steps, the time spent and the solution.
+        """
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        deadline = start + timeout
+        initial_state = initial_state or problem.initial_state()
+        value = value_getter(initial_state)
+        less, _, diff = value_operations(value(initial_state))
+        temperatures = self.temperatures
+
+        connections = []
+        processes = []
+        for index, temperature in enumerate(temperatures):
+            connection, other = multiprocessing.Pipe()
+            seed = None if self.seed is None else self.seed + index
+            processes.append(multiprocessing.Process(
+                target=_tempering_worker,
+                args=(self, other, problem, initial_state, temperature,
+                      deadline, seed)))
+            connections.append((connection, other))
+
+        # The chain at each temperature, from the hottest one
+        ladder = range(len(temperatures))
+        values = [value(initial_state)] * len(temperatures)
+        best_solution = initial_state
+        try:
+            for process in processes:
+                process.daemon = True
+                process.start()
+
+            for index, (connection, other) in enumerate(connections):
+                other.close()
+                connections[index] = connection
+
+            # Finished chains keep swapping until every chain is finished
+            finished = [False] * len(temperatures)
+            done = False
+            swaps = 0
+            while not done:
+                for index, connection in enumerate(connections):
+                    try:
+                        values[index], steps, finished[index] = \
+                            connection.recv()
+                    except EOFError:
+                        raise RuntimeError("A search worker failed")
+
+                    if stats is not None:
+                        stats.expanded += steps
+
+                done = all(finished) or time.time() > deadline
+
+                # Swap alternate pairs of neighbouring temperatures
+                for position in xrange(swaps % 2, len(ladder) - 1, 2):
+                    hot, cold = ladder[position], ladder[position + 1]
+                    exponent = diff(values[hot], values[cold]) * (
+                        1.0 / temperatures[position] -
+                        1.0 / temperatures[position + 1])
+                    if exponent >= 0 or \
+                            utils.probability(math.exp(exponent)):
+                        ladder[position], ladder[position + 1] = cold, hot
+                swaps += 1
+
+                for position, index in enumerate(ladder):
+                    connections[index].send(
+                        None if done else temperatures[position])
+
+            for connection in connections:
+                solution = connection.recv()
+                if less(value(solution), value(best_solution)):
+                    best_solution = solution
+        finally:
+            for process in processes:
+                process.join(1)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+
+            if stats is not None:
+                stats.phase('search', start)
+
+        if stats is not None:
+            stats.solution(best_solution)
+        return best_solution
+
+
+def _tempering_worker(searcher, connection, problem, state, temperature,
+                      deadline, seed):
+    """Run one chain of a ParallelTempering, sending its best state last."""
+    random.seed(seed)
+    value = value_getter(state)
+    less, _, diff = value_operations(value(state))
+    best_solution = state
+    remaining = searcher.max_steps
+
+    while temperature is not None:
+        steps = 0
+        finished = False
+        while steps < searcher.swap_interval:
+            if not remaining or time.time() > deadline:
+                finished = True
+                break
+
+            next_state = searcher.random_branch(problem, state)
+            if next_state is None:
+                finished = True
+                break
+
+            steps += 1
+            remaining -= 1
+            delta_e = diff(value(next_state), value(state))
+            if delta_e <= 0 or \
+                    utils.probability(math.exp(-delta_e / temperature)):
+                state = next_state
+                if less(value(state), value(best_solution)):
+                    best_solution = state
+
+        connection.send((value(state), steps, finished))
+        temperature = connection.recv()
+
+    connection.send(best_solution)
+
+
+class RandomRestartSearch(search.Search):
+    """
+    Run a local search from many restarts over a pool of processes.
+
+    Each restart runs the search with its own random seed, from the state
+    given by the start function, if any, else from the initial state. The
+    best solution of all restarts is returned once they are done, or at the
+    timeout, restarting until then if the number of restarts isn't given.
+    Restarts returning right at the timeout are waited for a short while.
+
+    >>> import problem
+    >>> spp = problem.ShortestPathProblem([
+    ...     [0, -1, -3], [0, 0, -5], [0, 0, 0]], 0, 2)
+    >>> restarts = RandomRestartSearch(
+    ...     search.GreedySearch(), restarts=4, workers=2)
+    >>> restarts.solve(spp)
+    {index: 2, value: -3, path: [0, 2]}
+
+    Anytime searches return their best state at the timeout, which is kept:
+
+    >>> cycle = problem.ShortestPathProblem(
+    ...     [[0, 1, 0], [0, 0, 1], [1, 0, 0]], 0, 2)
+    >>> annealing = search.SimulatedAnnealing(
+    ...     utils.exp_schedule(limit=10 ** 9))
+    >>> RandomRestartSearch(annealing, workers=2).solve(cycle, timeout=0.5)
+    {index: 0, value: 0, path: [0]}
+    """
+
+    def __init__(self, searcher, restarts=None, workers=None, start=None,
+                 seed=None):
+        """
+        Initialize the driver with the search to restart.
+
+        The number of workers defaults to the number of cores, and the
+        number of restarts to the number of workers if there's no timeout.
+        Restart i is seeded from seed + i, if a seed is given.
+        """
+        self.searcher = searcher
+        self.restarts = restarts
+        self.workers = workers or multiprocessing.cpu_count()
+        self.start = start
+        self.seed = seed
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """
+        Get the best solution found by the restarts.
+
+        The restarts run in other processes, so stats only get the time
+        spent and the solution.
+        """
+        restarts = self.restarts
+        if not timeout:
+            timeout = float('inf')
+            restarts = restarts or self.workers
+
+        start = time.time()
+        deadline = start + timeout
+        pool = multiprocessing.Pool(
+            self.workers, _initialize_restarts,
+            (self, problem, initial_state, deadline))
+
+        value = None
+        best_solution = None
+        started = 0
+        pending = []
+        expired = False
+        try:
+            while not expired:
+                while len(pending) < self.workers and \
+                        (restarts is None or started < restarts):
+                    pending.append(pool.apply_async(_restart, (started,)))
+                    started += 1
+
+                if not pending:
+                    break
+
+                remaining = deadline - time.time()
+                if remaining > 0:
+                    # Restarts finish in any order, collect whichever are done
+                    done = [result for result in pending if result.ready()]
+                    if not done:
+                        pending[0].wait(min(remaining, _POLL_INTERVAL))
+                        continue
+                else:
+                    # Anytime searches return at the deadline, wait for them
+                    expired = True
+                    grace = time.time() + _GRACE_PERIOD
+                    for result in pending:
+                        result.wait(max(0, grace - time.time()))
+                    done = [result for result in pending if result.ready()]
+
+                for result in done:
+                    pending.remove(result)
+                    solution = result.get()
+                    if solution is None:
+                        continue
+
+                    if value is None:
+                        value = value_getter(solution)
+                        less, _, _ = value_operations(value(solution))
+
+                    if not best_solution or \
+                            less(value(solution), value(best_solution)):
+                        best_solution = solution
+        finally:
+            pool.terminate()
+            pool.join()
+
+            if stats is not None:
+                stats.phase('search', start)
+
+        if stats is not None and best_solution:
+            stats.solution(best_solution)
+        return best_solution
+
+
+def _initialize_restarts(searcher, problem, initial_state, deadline):
+    """Keep the arguments shared by all restarts in the worker process."""
+    random.seed()
+    _shared['restarts'] = searcher
+    _shared['problem'] = problem
+    _shared['initial_state'] = initial_state
+    _shared['deadline'] = deadline
+
+
+def _restart(index):
+    """Run one restart of a RandomRestartSearch, None if it failed."""
+    driver = _shared['restarts']
+    problem = _shared['problem']
+    if driver.seed is not None:
+        random.seed(driver.seed + index)
+
+    if driver.start is not None:
+        initial_state = driver.start(problem)
+    else:
+        initial_state = _shared['initial_state']
+
+    remaining = _shared['deadline'] - time.time()
+    try:
+        return driver.searcher.solve(
+            problem, initial_state, timeout=remaining)
+    except search.TimeoutError:
+        return None
+
+
+def _initialize_worker(searcher, problems, timeout):
+    """Keep the arguments shared by all tasks in the worker process."""
+    _shared['search'] = searcher
+    _shared['problems'] = problems
+    _shared['timeout'] = timeout
+
+
+def _solve(index):
+    """Solve one of the shared problems."""
+    try:
+        solution = _shared['search'].solve(
+            _shared['problems'][index], timeout=_shared['timeout'])
+    except search.TimeoutError as error:
+        solution = error
+
+    return index, solution
+
+
+def unit_test():
+    """Test the module."""
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    unit_test()
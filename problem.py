@@ -3,6 +3,10 @@
 """Classes needed to model a search algorithm."""
 import abc
 import six
+import array
+import random
+import weakref
+import operator
 import itertools
 
 
@@ -25,6 +29,58 @@ class Problem:
         """Get all possible actions to be executed on a given state."""
         raise NotImplementedError()
 
+    def iter_actions(self, state):
+        """
+        Iterate over the possible actions on a given state.
+
+        Searches stopping at the first good action only build the actions
+        they try. Problems with large neighbourhoods should build them one
+        at a time instead of listing them all first.
+        """
+        return iter(self.actions(state))
+
+    def random_action(self, state):
+        """
+        Get a random action on a given state, or None if there's none.
+
+        Problems with large neighbourhoods should pick one directly instead
+        of listing them all first.
+        """
+        actions = self.actions(state)
+        return random.choice(actions) if actions else None
+
+    def state_key(self, state):
+        """
+        Get a key identifying a state, its hash by default.
+
+        Problems whose states map to the integers in range(key_space()) should
+        return them, letting searches store seen states in compact arrays.
+        """
+        return hash(state)
+
+    def key_space(self):
+        """Get the number of possible state keys, or None if unbounded."""
+        return None
+
+    def goal_states(self):
+        """
+        Return every goal state of the problem.
+
+        Optional, only needed to search backwards from the goal.
+        """
+        raise NotImplementedError()
+
+    def reverse_actions(self, state):
+        """
+        Get all actions leading from a state back to its predecessors.
+
+        Optional, only needed to search backwards from the goal. Applying one
+        of these actions to a state must give a predecessor whose value is
+        the cost from it to the goal, and the action's reverse must give the
+        forward action.
+        """
+        raise NotImplementedError()
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Action:
@@ -35,6 +91,10 @@ class Action:
         """Execute the action on a state."""
         raise NotImplementedError()
 
+    def reverse(self):
+        """Get the action going the opposite way, for backward search."""
+        raise NotImplementedError()
+
     def __str__(self):
         """The string representation of this action."""
         return self.__class__.__name__
@@ -46,13 +106,75 @@ class Action:
 
 @six.add_metaclass(abc.ABCMeta)
 class State:
-    """(Intermediate) State in the search for a solution."""
+    """
+    (Intermediate) State in the search for a solution.
+
+    States form the search tree: each one only links to the state it was
+    generated from and the action used, so histories are rebuilt on demand.
+    """
+
+    _parent = None
+    _action = None
+    _actions = None
 
     @property
     def value(self):
         """Get the value wrapped."""
         return ValueWrapper(self._value)
 
+    @property
+    def _action_history(self):
+        """Rebuild the list of actions that led to this state."""
+        actions = []
+        state = self
+        while state._action is not None:
+            actions.append(state._action)
+            state = state._parent
+
+        actions.reverse()
+        return (state._actions or []) + actions
+
+    @_action_history.setter
+    def _action_history(self, actions):
+        """
+        Set the list of actions that led to this state explicitly.
+
+        >>> s = ShortestPathState(1, 1, parent=ShortestPathState(0, 0))
+        >>> s._action_history = ['a', 'b']
+        >>> s._action_history, s.path
+        (['a', 'b'], [0, 1])
+        """
+        self._actions = list(actions) if actions else None
+        self._action = None
+
+    def detached(self):
+        """
+        Get a copy of the state cut from the search tree, without history.
+
+        Pickling it only costs the state's own attributes, whatever its
+        depth. The attributes are copied as they are, without going through
+        __getstate__, which would rebuild the history being dropped.
+        """
+        state = object.__new__(type(self))
+        state.__dict__.update(self.__dict__)
+        state._parent = state._action = state._actions = None
+        return state
+
+    def __getstate__(self):
+        """
+        Get the attributes to pickle, cutting the link to the parent state.
+
+        The action history is stored instead, so deep states don't pickle
+        their whole search tree recursively.
+        """
+        attributes = self.__dict__.copy()
+        if self._parent is not None:
+            attributes['_actions'] = self._action_history
+            attributes['_parent'] = None
+            attributes['_action'] = None
+
+        return attributes
+
     @abc.abstractmethod
     def __hash__(self):
         """Get a unique hash for the state."""
@@ -70,6 +192,76 @@ class State:
         return not self.__eq__(other)
 
 
+def value_getter(state):
+    """
+    Get a function reading the raw values of states like the given one.
+
+    States keeping their value in _value, without overriding the value
+    property, are read directly instead of wrapping every value read.
+
+    >>> value = value_getter(ShortestPathState(0, 3))
+    >>> value(ShortestPathState(1, 5))
+    5
+    """
+    if type(state).value is State.value and hasattr(state, '_value'):
+        return operator.attrgetter('_value')
+    else:
+        return lambda state: state.value.value
+
+
+def value_operations(value):
+    """
+    Get the (less, add, diff) functions working on raw values like one.
+
+    They do what ValueWrapper does, without the wrapping, for numbers or
+    for tuples of a fixed length.
+
+    >>> less, add, diff = value_operations((1, 2))
+    >>> less((1, 2), (2, 1)), less((1, 1), (1, 2)), add((1, 2), (3, 4))
+    (False, True, (4, 6))
+    >>> less, add, diff = value_operations(1.0)
+    >>> less(1.0, 2.0), add(1.0, 2.0), diff(1.0, 2.0)
+    (True, 3.0, -0.5)
+    """
+    if isinstance(value, tuple):
+        return tuple_less, tuple_add, tuple_diff
+    else:
+        return operator.lt, operator.add, scalar_diff
+
+
+def tuple_less(left, right):
+    """
+    Check whether a tuple is lesser than another, in product order.
+
+    It is lesser if no element is greater and some element is lesser.
+    """
+    any_lt = False
+    for a, b in itertools.izip(left, right):
+        if a > b:
+            return False
+        any_lt |= a < b
+
+    return any_lt
+
+
+def tuple_add(left, right):
+    """Add two tuples element by element."""
+    return tuple(a + b for a, b in itertools.izip(left, right))
+
+
+def tuple_diff(left, right):
+    """Get the greatest relative difference between two tuples."""
+    return max(scalar_diff(a, b) for a, b in itertools.izip(left, right))
+
+
+def scalar_diff(left, right):
+    """Get the relative difference between two numbers."""
+    if left != 0 or right != 0:
+        return (left - right) / max(abs(left), abs(right))
+    else:
+        return 0
+
+
 class ValueWrapper:
     """Wrapper around the state's values that allows tuple comparisons."""
 
@@ -77,22 +269,18 @@ class ValueWrapper:
         """Initialize the value."""
         self.value = value
 
+    def __repr__(self):
+        """String representation of the value."""
+        return repr(self.value)
+
     def diff(self, other):
         """Difference."""
         if isinstance(other, self.__class__):
             if isinstance(self.value, tuple) and isinstance(
                     other.value, tuple):
-                return max(tuple(
-                    ((a - b) / max(abs(a), abs(b))) if a != 0 or b != 0 else 0
-                    for a, b in itertools.izip(
-                        self.value, other.value)
-                ))
+                return tuple_diff(self.value, other.value)
             else:
-                if self.value != 0 or other.value != 0:
-                    return (self.value - other.value) / max(
-                        abs(self.value), abs(other.value))
-                else:
-                    return 0
+                return scalar_diff(self.value, other.value)
         else:
             return self.diff(ValueWrapper(other))
 
@@ -101,9 +289,7 @@ class ValueWrapper:
         if isinstance(other, self.__class__):
             if isinstance(self.value, tuple) and isinstance(
                     other.value, tuple):
-                return tuple(a + b for a, b in itertools.izip(
-                    self.value, other.value)
-                )
+                return tuple_add(self.value, other.value)
             else:
                 return self.value + other.value
         else:
@@ -116,7 +302,7 @@ class ValueWrapper:
     def __le__(self, other):
         """Check whether the right value is not lesser."""
         if isinstance(other, self.__class__):
-            return not other > self
+            return not self > other
         else:
             return False
 
@@ -133,13 +319,7 @@ class ValueWrapper:
         if isinstance(other, self.__class__):
             if isinstance(self.value, tuple) and isinstance(
                     other.value, tuple):
-                any_lt = False
-                for a, b in itertools.izip(self.value, other.value):
-                    if a > b:
-                        return False
-                    any_lt |= a < b
-
-                return any_lt
+                return tuple_less(self.value, other.value)
             else:
                 return self.value < other.value
         else:
@@ -161,8 +341,29 @@ class ValueWrapper:
             or self.value == other
 
 
+class _GraphVersion(object):
+    """
+    The version of a graph, shared by the problems over it.
+
+    Versions are taken from a single counter, so they are never reused,
+    even by a graph created after another one died.
+    """
+
+    def __init__(self, graph):
+        """Give a new version to the graph, the first object holding it."""
+        self.graph = graph
+        self.value = next(_changes)
+
+
+# The version of each graph in use, by the id of the first object holding
+# it. Problems keep the version of their graph alive, and the version keeps
+# the graph alive, so an id is never reused while its entry is here.
+_graph_versions = weakref.WeakValueDictionary()
+_changes = itertools.count(1)
+
+
 class ShortestPathProblem(Problem):
-    """Basic shortest path problem."""
+    """Basic shortest path problem over a weighted adjacency matrix."""
 
     def __init__(self, adjacency_matrix, node_start, node_end):
         """Initialize an instance of ShortestPathProblem."""
@@ -198,42 +399,478 @@ class ShortestPathProblem(Problem):
         """
         return state.index == self.end
 
+    def state_key(self, state):
+        """Get a key identifying a state, the index of its node."""
+        return state.index
+
+    def key_space(self):
+        """Get the number of possible state keys, one per node."""
+        return self.num_nodes
+
+    @property
+    def num_nodes(self):
+        """Get the number of nodes in the graph."""
+        return len(self.adjacency_matrix)
+
+    def graph(self):
+        """
+        Get the objects holding the graph.
+
+        Problems sharing these objects, compared by identity, share the same
+        graph, along with its version.
+        """
+        return (self.adjacency_matrix,)
+
+    @property
+    def version(self):
+        """
+        Get the version of the graph, which changes on every set_edge.
+
+        The version belongs to the graph, so every problem over it sees the
+        changes made through any of them. It is forgotten along with the
+        last problem over the graph, and a graph seen again gets a new one.
+
+        >>> matrix = [[0, 1], [0, 0]]
+        >>> spp = ShortestPathProblem(matrix, 0, 1)
+        >>> other = ShortestPathProblem(matrix, 1, 0)
+        >>> version = other.version
+        >>> spp.set_edge(1, 0, 2)
+        >>> other.version == spp.version != version
+        True
+        >>> known = len(_graph_versions)
+        >>> version = spp.version
+        >>> del spp, other
+        >>> len(_graph_versions) == known - 1
+        True
+        >>> ShortestPathProblem(matrix, 0, 1).version != version
+        True
+        """
+        return self._graph_version().value
+
+    def _changed(self):
+        """Give the graph a new version."""
+        self._graph_version().value = next(_changes)
+
+    def _graph_version(self):
+        """Get the version shared by the problems over the same graph."""
+        graph = self.graph()[0]
+        version = getattr(self, '_version', None)
+        if version is None or version.graph is not graph:
+            version = _graph_versions.get(id(graph))
+            if version is None:
+                version = _GraphVersion(graph)
+                _graph_versions[id(graph)] = version
+            self._version = version
+        return version
+
+    def successors(self, index):
+        """
+        Get the (node, cost) pairs reachable from a node in one step.
+
+        Non zero entries of the adjacency matrix are the costs of the edges.
+
+        >>> spp = ShortestPathProblem([[0,1,4],[0,0,2],[0,0,0]], 0, 2)
+        >>> list(spp.successors(0))
+        [(1, 1), (2, 4)]
+        """
+        return [
+            (other, cost)
+            for other, cost in enumerate(self.adjacency_matrix[index])
+            if cost
+        ]
+
+    def predecessors(self, index):
+        """
+        Get the (node, cost) pairs that reach a node in one step.
+
+        >>> spp = ShortestPathProblem([[0,1,4],[0,0,2],[0,0,0]], 0, 2)
+        >>> list(spp.predecessors(2))
+        [(0, 4), (1, 2)]
+        """
+        return [
+            (other, row[index])
+            for other, row in enumerate(self.adjacency_matrix)
+            if row[index]
+        ]
+
+    def set_edge(self, start, end, cost):
+        """
+        Change the cost of an edge, a cost of 0, None or infinity removing it.
+
+        Sparse problems take the same costs, closing the edge instead.
+
+        >>> spp = ShortestPathProblem([[0, 1], [0, 0]], 0, 1)
+        >>> spp.set_edge(0, 1, 3)
+        >>> spp.set_edge(1, 0, 2)
+        >>> spp.adjacency_matrix
+        [[0, 3], [2, 0]]
+        """
+        if not cost or cost == float('inf'):
+            cost = 0
+
+        self.adjacency_matrix[start][end] = cost
+        self._changed()
+
     def actions(self, state):
         """Get all possible actions from the given state."""
         index = state.index
         valid_actions = [
-            ShortestPathNodeTraversal(index, other)
-            for other, valid in enumerate(self.adjacency_matrix[index])
-            if valid
+            ShortestPathNodeTraversal(index, other, cost)
+            for other, cost in self.successors(index)
         ]
 
         return valid_actions
 
+    def iter_actions(self, state):
+        """
+        Iterate over the possible actions from the given state.
+
+        >>> spp = ShortestPathProblem([[0,1,4],[0,0,2],[0,0,0]], 0, 2)
+        >>> next(spp.iter_actions(spp.initial_state())).end
+        1
+        """
+        index = state.index
+        for other, cost in self.successors(index):
+            yield ShortestPathNodeTraversal(index, other, cost)
+
+    def random_action(self, state):
+        """
+        Get a random action from the given state, or None if there's none.
+
+        A few random entries of the adjacency matrix row are tried before
+        listing the edges.
+
+        >>> spp = ShortestPathProblem([[0,1,4],[0,0,2],[0,0,0]], 0, 2)
+        >>> spp.random_action(spp.initial_state()).end in (1, 2)
+        True
+        >>> spp.random_action(ShortestPathState(2, 0))
+        """
+        index = state.index
+        row = self.adjacency_matrix[index]
+        for _ in xrange(8):
+            other = random.randrange(len(row))
+            if row[other]:
+                return ShortestPathNodeTraversal(index, other, row[other])
+
+        return super(ShortestPathProblem, self).random_action(state)
+
+    def path_state(self, path):
+        """
+        Get the state reached by following a path of nodes from its first one.
+
+        >>> spp = ShortestPathProblem([[0,1,0],[0,0,1],[0,0,0]], 0, 2)
+        >>> spp.path_state([0, 1, 2])
+        {index: 2, value: 2, path: [0, 1, 2]}
+        """
+        state = ShortestPathState(path[0], 0)
+        for end in path[1:]:
+            costs = [cost for other, cost in self.successors(state.index)
+                     if other == end]
+            if not costs:
+                raise ValueError(
+                    "No edge from node %s to node %s" % (state.index, end))
+
+            action = ShortestPathNodeTraversal(state.index, end, min(costs))
+            state = action(state)
+            state._action = action
+
+        return state
+
+    def goal_states(self):
+        """
+        Return every goal state of the problem.
+
+        >>> ShortestPathProblem([[0,1],[1,0]], 0, 1).goal_states()
+        [{index: 1, value: 0, path: [1]}]
+        """
+        return [ShortestPathState(self.end, 0)]
+
+    def reverse_actions(self, state):
+        """Get the traversals from the given state back to its predecessors."""
+        index = state.index
+        return [
+            ShortestPathNodeTraversal(index, other, cost)
+            for other, cost in self.predecessors(index)
+        ]
+
+
+class SparseShortestPathProblem(ShortestPathProblem):
+    """
+    Shortest path problem over a graph in compressed sparse row form.
+
+    The neighbours of node i are neighbours[offsets[i]:offsets[i + 1]], with
+    the matching edge costs in weights (or unit costs if weights is None).
+    Expanding a node is O(degree) and memory is O(V + E).
+    """
+
+    # Number of edges closed by an infinite cost
+    _closed = 0
+
+    def __init__(self, offsets, neighbours, node_start, node_end,
+                 weights=None):
+        """
+        Initialize an instance of SparseShortestPathProblem.
+
+        >>> spp = SparseShortestPathProblem([0, 2, 3, 3], [1, 2, 2], 0, 2)
+        >>> spp.num_nodes
+        3
+        >>> spp.actions(spp.initial_state())
+        [ShortestPathNodeTraversal, ShortestPathNodeTraversal]
+        """
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.weights = weights
+        self.start = node_start
+        self.end = node_end
+        self._transpose = None
+
+    @classmethod
+    def from_edges(cls, edges, node_start, node_end, num_nodes=None,
+                   directed=True):
+        """
+        Build the problem from (start, end) or (start, end, cost) edges.
+
+        >>> spp = SparseShortestPathProblem.from_edges(
+        ...     [(0, 1, 2.5), (1, 2, 1.0), (0, 2, 4.0)], 0, 2)
+        >>> list(spp.successors(0))
+        [(1, 2.5), (2, 4.0)]
+        >>> spp = SparseShortestPathProblem.from_edges(
+        ...     [(0, 1), (1, 2)], 2, 0, directed=False)
+        >>> list(spp.successors(1))
+        [(2, 1), (0, 1)]
+        """
+        edges = list(edges)
+        if not directed:
+            edges.extend((edge[1], edge[0]) + tuple(edge[2:])
+                         for edge in edges[:])
+
+        if num_nodes is None:
+            num_nodes = 1 + max(
+                [max(edge[0], edge[1]) for edge in edges] or [-1])
+
+        counts = [0] * (num_nodes + 1)
+        for edge in edges:
+            counts[edge[0] + 1] += 1
+
+        offsets = array.array('l', counts)
+        for index in xrange(num_nodes):
+            offsets[index + 1] += offsets[index]
+
+        neighbours = array.array('l', [0]) * len(edges)
+        weighted = any(len(edge) > 2 for edge in edges)
+        weights = array.array('d', [0]) * len(edges) if weighted else None
+
+        positions = offsets[:-1]
+        for edge in edges:
+            position = positions[edge[0]]
+            positions[edge[0]] += 1
+            neighbours[position] = edge[1]
+            if weighted:
+                weights[position] = edge[2] if len(edge) > 2 else 1
+
+        return cls(offsets, neighbours, node_start, node_end, weights)
+
+    @classmethod
+    def from_csr(cls, matrix, node_start, node_end):
+        """
+        Build the problem from a scipy.sparse CSR matrix.
+
+        Only the indptr, indices and data attributes are used, so any object
+        exposing them works.
+        """
+        return cls(matrix.indptr, matrix.indices, node_start, node_end,
+                   matrix.data)
+
+    @property
+    def num_nodes(self):
+        """Get the number of nodes in the graph."""
+        return len(self.offsets) - 1
+
+    def graph(self):
+        """Get the objects holding the graph."""
+        return (self.offsets, self.neighbours, self.weights)
+
+    def successors(self, index):
+        """Get the (node, cost) pairs reachable from a node in one step."""
+        begin = self.offsets[index]
+        end = self.offsets[index + 1]
+        neighbours = self.neighbours[begin:end]
+        if self.weights is None:
+            return [(other, 1) for other in neighbours]
+        elif self._closed:
+            return [(other, cost) for other, cost in zip(
+                neighbours, self.weights[begin:end]) if cost < float('inf')]
+        else:
+            return zip(neighbours, self.weights[begin:end])
+
+    def random_action(self, state):
+        """
+        Get a random action from the given state, or None if there's none.
+
+        >>> spp = SparseShortestPathProblem.from_edges(
+        ...     [(0, 1), (0, 2), (1, 2)], 0, 2)
+        >>> spp.random_action(spp.initial_state()).end in (1, 2)
+        True
+        >>> spp.set_edge(0, 1, float('inf'))
+        >>> spp.random_action(spp.initial_state()).end
+        2
+        >>> spp.random_action(ShortestPathState(2, 0))
+        """
+        if self._closed:
+            # Closed edges can't be told apart without looking at them
+            return Problem.random_action(self, state)
+
+        index = state.index
+        begin = self.offsets[index]
+        end = self.offsets[index + 1]
+        if begin == end:
+            return None
+
+        position = random.randrange(begin, end)
+        cost = 1 if self.weights is None else self.weights[position]
+        return ShortestPathNodeTraversal(
+            index, self.neighbours[position], cost)
+
+    def set_edge(self, start, end, cost):
+        """
+        Change the cost of an existing edge, a cost of 0, None or infinity
+        closing it, like removing an edge of a dense problem.
+
+        The compressed rows can't grow, so edges can't be added or removed:
+        raise ValueError if there's no edge from start to end. The reversed
+        graph, if built, changes along.
+
+        >>> spp = SparseShortestPathProblem.from_edges(
+        ...     [(0, 1), (1, 2), (0, 2)], 0, 2)
+        >>> spp.set_edge(0, 2, 5)
+        >>> spp.set_edge(1, 2, float('inf'))
+        >>> list(spp.successors(0)), list(spp.successors(1))
+        ([(1, 1.0), (2, 5.0)], [])
+        >>> list(spp.predecessors(2))
+        [(0, 5.0)]
+        >>> spp.set_edge(1, 2, 2)
+        >>> list(spp.predecessors(2)), list(spp.successors(1))
+        ([(0, 5.0), (1, 2.0)], [(2, 2.0)])
+        >>> spp.set_edge(0, 1, 0)
+        >>> list(spp.successors(0))
+        [(2, 5.0)]
+        >>> spp.set_edge(2, 0, 1)
+        Traceback (most recent call last):
+        ...
+        ValueError: No edge from node 2 to node 0
+        """
+        if not cost:
+            cost = float('inf')
+
+        positions = self._edge_positions(start, end)
+        transpose = self._transpose
+        if transpose is not None:
+            reverse_positions = transpose._edge_positions(end, start)
+
+        # Both graphs were checked, so they can't be left half changed
+        self._set_costs(positions, cost)
+        if transpose is not None:
+            transpose._set_costs(reverse_positions, cost)
+            transpose._changed()
+
+        self._changed()
+
+    def _edge_positions(self, start, end):
+        """Get the positions of the edges from start to end, if any."""
+        begin = self.offsets[start]
+        positions = [
+            position
+            for position in xrange(begin, self.offsets[start + 1])
+            if self.neighbours[position] == end
+        ]
+        if not positions:
+            raise ValueError(
+                "No edge from node %s to node %s" % (start, end))
+
+        return positions
+
+    def _set_costs(self, positions, cost):
+        """Change the costs of the edges at the given positions."""
+        if self.weights is None:
+            self.weights = array.array('d', [1]) * len(self.neighbours)
+
+        inf = float('inf')
+        for position in positions:
+            self._closed += (cost == inf) - (self.weights[position] == inf)
+            self.weights[position] = cost
+
+    def predecessors(self, index):
+        """
+        Get the (node, cost) pairs that reach a node in one step.
+
+        The reversed graph is built on first use.
+
+        >>> spp = SparseShortestPathProblem.from_edges(
+        ...     [(0, 2, 3.0), (1, 2, 1.0)], 0, 2)
+        >>> list(spp.predecessors(2))
+        [(0, 3.0), (1, 1.0)]
+        """
+        if self._transpose is None:
+            self._transpose = self.transpose()
+
+        return self._transpose.successors(index)
+
+    def transpose(self):
+        """
+        Get the problem over the reversed graph, from end to start.
+
+        Closed edges are kept, so they can be opened again in both graphs.
+        """
+        edges = []
+        weights = self.weights
+        for index in xrange(self.num_nodes):
+            for position in xrange(self.offsets[index],
+                                   self.offsets[index + 1]):
+                other = self.neighbours[position]
+                if weights is None:
+                    edges.append((other, index))
+                else:
+                    edges.append((other, index, weights[position]))
+
+        transpose = SparseShortestPathProblem.from_edges(
+            edges, self.end, self.start, self.num_nodes)
+        transpose._closed = self._closed
+        return transpose
+
 
 class ShortestPathNodeTraversal(Action):
     """Node Traversal action for the ShortestPath Problem."""
 
-    def __init__(self, start, end):
+    def __init__(self, start, end, cost=1):
         """Initialize the node traversal action."""
         self.start = start
         self.end = end
+        self.cost = cost
 
     def __call__(self, state):
         """Execute the node traversal on a given state."""
-        return ShortestPathState(
-            self.end,
-            state.value + 1,
-            state.path + [self.end]
-        )
+        cost = self.cost
+        if isinstance(cost, tuple):
+            value = tuple_add(state._value, cost)
+        else:
+            value = state._value + cost
+
+        return ShortestPathState(self.end, value, parent=state)
+
+    def reverse(self):
+        """Get the traversal of the same edge in the opposite direction."""
+        return ShortestPathNodeTraversal(self.end, self.start, self.cost)
 
 
 class ShortestPathState(State):
     """(Intermediate) State in the search for a solution."""
 
-    def __init__(self, index, value, path=None):
+    def __init__(self, index, value, path=None, parent=None):
         """
         Initialize an instance of ShortestPathState.
 
+        The path is either given explicitly or rebuilt from the parent state.
+
         >>> s = ShortestPathState(1, 2)
         >>> s.index
         1
@@ -241,10 +878,52 @@ class ShortestPathState(State):
         2
         >>> s.path
         [1]
+        >>> ShortestPathState(3, 4, parent=ShortestPathState(2, 3, [0, 2]))
+        {index: 3, value: 4, path: [0, 2, 3]}
         """
         self.index = index
         self._value = value
-        self.path = path or [index]
+        self._path = path or None
+        self._parent = parent
+
+    @property
+    def path(self):
+        """Rebuild the list of nodes visited to reach this state."""
+        nodes = []
+        state = self
+        while state._path is None and state._parent is not None:
+            nodes.append(state.index)
+            state = state._parent
+
+        path = list(state._path or [state.index])
+        nodes.reverse()
+        path.extend(nodes)
+        return path
+
+    def __getstate__(self):
+        """
+        Get the attributes to pickle, cutting the link to the parent state.
+
+        >>> import pickle
+        >>> s = ShortestPathState(2, 3, parent=ShortestPathState(1, 2))
+        >>> pickle.loads(pickle.dumps(s))
+        {index: 2, value: 3, path: [1, 2]}
+        """
+        attributes = State.__getstate__(self)
+        attributes['_path'] = self.path
+        return attributes
+
+    def detached(self):
+        """
+        Get a copy of the state cut from the search tree, without history.
+
+        >>> s = ShortestPathState(2, 3, parent=ShortestPathState(1, 2))
+        >>> s.detached()
+        {index: 2, value: 3, path: [2]}
+        """
+        state = State.detached(self)
+        state._path = None
+        return state
 
     def __repr__(self):
         """
@@ -8,8 +8,12 @@ import math
 import time
 import heapq
 import utils
-import random
+import bisect
+import threading
+import functools
+import itertools
 import collections
+from problem import value_getter, value_operations
 
 
 class TimeoutError(Exception):
@@ -18,10 +22,123 @@ class TimeoutError(Exception):
     pass
 
 
+class _Pause(object):
+    """The type of PAUSE."""
+
+    def __repr__(self):
+        """String representation of the pause."""
+        return 'PAUSE'
+
+# Yielded by Search.steps to give control back to the caller
+PAUSE = _Pause()
+
+
+class SearchStats:
+    """
+    Counters and timings collected while solving a problem.
+
+    Pass an instance as the stats argument of solve. The hooks, if given, are
+    called with the state expanded, generated or returned as solution.
+
+    >>> stats = SearchStats()
+    >>> stats.generate('b')
+    >>> stats.generate('a', new=False)
+    >>> stats.expand('a', frontier=1, seen=2)
+    >>> stats.expanded, stats.generated, stats.duplicates
+    (1, 2, 1)
+    >>> stats.peak_frontier, stats.peak_seen
+    (1, 2)
+    >>> double = stats.heuristic(lambda state: 2)
+    >>> double('a'), stats.heuristic_calls
+    (2, 1)
+    >>> found = []
+    >>> stats = SearchStats(on_solution=found.append)
+    >>> stats.solution('a')
+    >>> found
+    ['a']
+    """
+
+    def __init__(self, on_expand=None, on_generate=None, on_solution=None):
+        """Initialize the counters to zero and store the hooks."""
+        self.on_expand = on_expand
+        self.on_generate = on_generate
+        self.on_solution = on_solution
+
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.peak_frontier = 0
+        self.peak_seen = 0
+        self.heuristic_calls = 0
+        self.heuristic_time = 0.0
+        self.phases = {}
+
+    def expand(self, state, frontier=0, seen=0):
+        """Count an expanded state along with the current memory use."""
+        self.expanded += 1
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+        if seen > self.peak_seen:
+            self.peak_seen = seen
+        if self.on_expand is not None:
+            self.on_expand(state)
+
+    def generate(self, state, new=True):
+        """Count a generated state, and whether it was pruned as duplicate."""
+        self.generated += 1
+        if not new:
+            self.duplicates += 1
+        if self.on_generate is not None:
+            self.on_generate(state)
+
+    def solution(self, state):
+        """Report the solution found."""
+        if self.on_solution is not None:
+            self.on_solution(state)
+
+    def heuristic(self, heuristic):
+        """Wrap an heuristic to count its calls and the time spent on them."""
+        def timed(state):
+            start = time.time()
+            try:
+                return heuristic(state)
+            finally:
+                self.heuristic_calls += 1
+                self.heuristic_time += time.time() - start
+
+        return timed
+
+    def phase(self, name, since):
+        """Add the time ellapsed since a given time to a phase."""
+        self.phases[name] = self.phases.get(name, 0.0) + time.time() - since
+
+    def as_dict(self):
+        """Get the counters and timings as a dictionary."""
+        return {
+            'expanded': self.expanded,
+            'generated': self.generated,
+            'duplicates': self.duplicates,
+            'peak_frontier': self.peak_frontier,
+            'peak_seen': self.peak_seen,
+            'heuristic_calls': self.heuristic_calls,
+            'heuristic_time': self.heuristic_time,
+            'phases': dict(self.phases),
+        }
+
+    def __repr__(self):
+        """Get a short description of the counters."""
+        return 'SearchStats(expanded=%d, generated=%d, duplicates=%d)' % (
+            self.expanded, self.generated, self.duplicates)
+
+
 @six.add_metaclass(abc.ABCMeta)
 class Search:
     """A type of search."""
 
+    # Whether returned solutions are proven optimal (given an admissible
+    # heuristic)
+    optimal = False
+
     def create_queue(self):
         """Create a queue for storing the states in the search."""
         raise NotImplementedError()
@@ -34,9 +151,22 @@ class Search:
         """Add a state to seen set."""
         seen.add(state)
 
-    def create_seen_set(self):
-        """Create a structure to store information of states seen."""
-        return set()
+    def create_seen_set(self, problem=None):
+        """
+        Create a structure to store information of states seen.
+
+        Given the problem, the structure only stores the keys of the states:
+        in a dense array if the problem has a bounded key space, or in a set
+        of keys otherwise.
+        """
+        if problem is None:
+            return set()
+
+        size = problem.key_space()
+        if size is not None:
+            return DenseSeenSet(size, problem.state_key)
+        else:
+            return KeySeenSet(problem.state_key)
 
     def push_if_new(self, queue, state, seen, problem):
         """Add a state to the queue if it hasn't been evaluated yet."""
@@ -52,23 +182,130 @@ class Search:
         """Get the next state from the queue."""
         raise NotImplementedError()
 
+    def solve_iter(self, problem, initial_state=None, timeout=None,
+                   stats=None):
+        """
+        Yield solutions to the problem as they are found, each one better.
+
+        Searches improving on their solutions over time yield every
+        improvement, so callers can stop at any time with the best solution
+        so far. Others only yield the solution of solve, if any.
+
+        >>> import problem
+        >>> spp = problem.ShortestPathProblem([[0, 1], [0, 0]], 0, 1)
+        >>> list(BreadthFirstSearch().solve_iter(spp))
+        [{index: 1, value: 1, path: [0, 1]}]
+        """
+        solution = self.solve(problem, initial_state, timeout, stats=stats)
+        if solution is not None:
+            yield solution
+
+    def solve_async(self, problem, initial_state=None, timeout=None,
+                    stats=None, every=1000, executor=None, loop=None):
+        """
+        Get an asyncio future of the solution to the problem.
+
+        Searches running through steps run on the event loop itself, giving
+        it back every given number of expansions, and stop as soon as the
+        future is cancelled. Other searches, or every search if an executor
+        is given, run in the executor instead (the loop's default one if
+        None), where cancelling the future doesn't stop them before the
+        timeout.
+        """
+        try:
+            import asyncio
+        except ImportError:
+            import trollius as asyncio
+
+        loop = loop or asyncio.get_event_loop()
+        if executor is not None or not self._runs_in_steps():
+            return loop.run_in_executor(executor, functools.partial(
+                self.solve, problem, initial_state, timeout, stats=stats))
+
+        future = loop.create_future() if hasattr(loop, 'create_future') \
+            else asyncio.Future(loop=loop)
+        steps = self.steps(problem, initial_state, timeout, stats, every)
+
+        def step():
+            if future.cancelled():
+                steps.close()
+                return
+
+            try:
+                result = next(steps)
+            except Exception as error:
+                future.set_exception(error)
+                return
+
+            if result is PAUSE:
+                loop.call_soon(step)
+            else:
+                steps.close()
+                future.set_result(result)
+
+        loop.call_soon(step)
+        return future
+
+    def _runs_in_steps(self):
+        """Check whether solve runs through steps, by where they're defined."""
+        def owner(name):
+            for cls in type(self).__mro__:
+                if name in cls.__dict__:
+                    return cls
+
+        return owner('solve') is owner('steps')
+
+    def generate(self, state, action):
+        """Execute an action, linking the new state to its parent."""
+        new_state = action(state)
+        new_state._parent = state
+        new_state._action = action
+        return new_state
+
     def branch(self, problem, state):
         """Branch a state into its possible continuations."""
         actions = problem.actions(state)
-        new_states = []
-        for action in actions:
-            new_state = action(state)
-            try:
-                new_state._action_history = state._action_history + [action]
-            except:
-                new_state._action_history = [action]
+        return [self.generate(state, action) for action in actions]
 
-            new_states.append(new_state)
+    def iter_branch(self, problem, state):
+        """Branch a state lazily, one continuation at a time."""
+        for action in problem.iter_actions(state):
+            yield self.generate(state, action)
 
-        return new_states
+    def random_branch(self, problem, state):
+        """Get a random continuation of a state, or None if there's none."""
+        action = problem.random_action(state)
+        if action is None:
+            return None
 
-    def solve(self, problem, initial_state=None, timeout=None):
-        """Get a solution to the problem."""
+        return self.generate(state, action)
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """
+        Get a solution to the problem.
+
+        Counters and timings are collected into stats, if given.
+        """
+        for result in self.steps(problem, initial_state, timeout, stats):
+            pass
+
+        return result
+
+    def steps(self, problem, initial_state=None, timeout=None, stats=None,
+              every=None):
+        """
+        Run the search step by step, for cooperative scheduling.
+
+        PAUSE is yielded after every given number of expansions, if any, and
+        the solution (or None) last. Searches overriding solve without
+        overriding steps don't run through it.
+
+        >>> import problem
+        >>> spp = problem.ShortestPathProblem([[0, 1, 0], [0, 0, 1],
+        ...                                   [0, 0, 0]], 0, 2)
+        >>> list(BreadthFirstSearch().steps(spp, every=1))
+        [PAUSE, PAUSE, {index: 2, value: 2, path: [0, 1, 2]}]
+        """
         if not timeout:
             timeout = float('inf')
 
@@ -76,23 +313,46 @@ class Search:
         initial_state = initial_state or problem.initial_state()
 
         queue = self.create_queue()
-        seen = self.create_seen_set()
+        seen = self.create_seen_set(problem)
         self.push_if_new(queue, initial_state, seen, problem)
-
-        while len(queue) > 0:
-            current = time.time()
-            if current - start > timeout:
-                raise TimeoutError()
-
-            state = self.pop(queue)
-            if problem.is_solution(state):
-                return state
-
-            branched_states = self.branch(problem, state)
-            for branched_state in branched_states:
-                self.push_if_new(queue, branched_state, seen, problem)
-
-        return None
+        countdown = every or -1
+
+        if stats is not None:
+            stats.phase('setup', start)
+
+        searching = time.time()
+        try:
+            while len(queue) > 0:
+                current = time.time()
+                if current - start > timeout:
+                    raise TimeoutError()
+
+                state = self.pop(queue)
+                if problem.is_solution(state):
+                    if stats is not None:
+                        stats.solution(state)
+                    yield state
+                    return
+
+                branched_states = self.branch(problem, state)
+                for branched_state in branched_states:
+                    if stats is not None:
+                        stats.generate(branched_state, self.is_new(
+                            branched_state, seen, problem))
+                    self.push_if_new(queue, branched_state, seen, problem)
+
+                if stats is not None:
+                    stats.expand(state, len(queue), len(seen))
+
+                countdown -= 1
+                if not countdown:
+                    countdown = every
+                    yield PAUSE
+        finally:
+            if stats is not None:
+                stats.phase('search', searching)
+
+        yield None
 
 
 class BreadthFirstSearch(Search):
@@ -156,6 +416,8 @@ class DepthFirstSearch(Search):
 class BestFirstSearch(Search):
     """An optiminal search."""
 
+    optimal = True
+
     def __init__(self, heuristic=None):
         """
         Initialize an instance of A* search.
@@ -174,25 +436,109 @@ class BestFirstSearch(Search):
         0
         """
         self.heuristic = heuristic or ZeroHeuristic()
-        self.value_states_dict = {}
 
     def create_queue(self):
-        """Create a priority queue for storing the states in the search."""
-        return []
+        """
+        Create a priority queue for storing the states in the search.
 
-    def push(self, queue, state, value=None):
+        Each call gets its own queue, so one instance can serve several
+        searches at the same time.
         """
-        Add a state to the priority queue.
+        return BucketQueue()
 
-        Manage the priority queue as a heap of (value, stack),
-        where stack contains all the states with the same value.
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """
+        Get an optimal solution to the problem.
 
-        This minimizes the number of times the heap is used.
+        The cheapest known path to every state is kept, so a state reached
+        again through a cheaper path gets queued again. Outdated entries in
+        the queue are skipped when popped (lazy deletion).
+        """
+        for result in self.steps(problem, initial_state, timeout, stats):
+            pass
 
-        States are retrieved using LIFO in order to try a depth first approach.
+        return result
 
-        [value] => stack
-        relationships are stored in the variable self.value_states_dict
+    def steps(self, problem, initial_state=None, timeout=None, stats=None,
+              every=None):
+        """Run the search step by step, yielding PAUSE every few expansions."""
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        initial_state = initial_state or problem.initial_state()
+        heuristic = self.heuristic
+        if stats is not None:
+            heuristic = stats.heuristic(heuristic)
+
+        # Raw values, without wrapping them on every read
+        value = value_getter(initial_state)
+        less, add, _ = value_operations(value(initial_state))
+
+        key = problem.state_key
+        queue = self.create_queue()
+        best = {key(initial_state): initial_state}
+        self.push(queue, initial_state,
+                  add(value(initial_state), heuristic(initial_state)))
+        countdown = every or -1
+
+        if stats is not None:
+            stats.phase('setup', start)
+
+        searching = time.time()
+        try:
+            while len(queue) > 0:
+                current = time.time()
+                if current - start > timeout:
+                    raise TimeoutError()
+
+                state = self.pop(queue)
+                if best.get(key(state)) is not state:
+                    continue
+
+                if problem.is_solution(state):
+                    if stats is not None:
+                        stats.solution(state)
+                    yield state
+                    return
+
+                for branched_state in self.branch(problem, state):
+                    branched_key = key(branched_state)
+                    known = best.get(branched_key)
+                    new = known is None or \
+                        less(value(branched_state), value(known))
+                    if new:
+                        best[branched_key] = branched_state
+                        dropped = self.push(queue, branched_state, add(
+                            value(branched_state), heuristic(branched_state)))
+
+                        # Forget dropped states, so they can be queued again
+                        if dropped is not None and \
+                                best.get(key(dropped)) is dropped:
+                            del best[key(dropped)]
+
+                    if stats is not None:
+                        stats.generate(branched_state, new)
+
+                if stats is not None:
+                    stats.expand(state, len(queue), len(best))
+
+                countdown -= 1
+                if not countdown:
+                    countdown = every
+                    yield PAUSE
+        finally:
+            if stats is not None:
+                stats.phase('search', searching)
+
+        yield None
+
+    def push(self, queue, state, value=None):
+        """
+        Add a state to the priority queue.
+
+        The state is prioritized by its value plus the heuristic, unless the
+        value is given. Return the state dropped to make room for it, if any.
         """
         if value is None:
             g = state.value
@@ -201,25 +547,380 @@ class BestFirstSearch(Search):
         else:
             f = value
 
-        if f in self.value_states_dict:
-            stack = self.value_states_dict[f]
-        else:
+        queue.push(state, f)
+
+    def pop(self, queue):
+        """Get the next state from the priority queue."""
+        return queue.pop()[1]
+
+
+class BucketQueue:
+    """
+    A priority queue of states for a single search.
+
+    Manage the priority queue as a heap of (value, stack),
+    where stack contains all the states with the same value.
+
+    This minimizes the number of times the heap is used.
+
+    States are retrieved using LIFO in order to try a depth first approach.
+
+    >>> q = BucketQueue()
+    >>> q.push('a', 2)
+    >>> q.push('b', 1)
+    >>> q.push('c', 1)
+    >>> len(q)
+    3
+    >>> q.pop()
+    (1, 'c')
+    >>> q.pop()
+    (1, 'b')
+    >>> q.pop()
+    (2, 'a')
+    >>> len(q)
+    0
+    """
+
+    def __init__(self):
+        """Initialize an empty queue."""
+        self.heap = []
+        self.buckets = {}
+        self.size = 0
+
+    def __len__(self):
+        """Get the number of states in the queue."""
+        return self.size
+
+    def push(self, state, value):
+        """Add a state to the queue."""
+        stack = self.buckets.get(value)
+        if stack is None:
             stack = []
-            self.value_states_dict[f] = stack
-            heapq.heappush(queue, (f, stack))
+            self.buckets[value] = stack
+            heapq.heappush(self.heap, (value, stack))
 
         stack.append(state)
+        self.size += 1
+
+    def pop(self):
+        """Remove the next state from the queue and get it with its value."""
+        value, stack = self.heap[0]
+        element = stack.pop()
+
+        if not stack:
+            heapq.heappop(self.heap)
+            del self.buckets[value]
+
+        self.size -= 1
+        return value, element
+
+
+class DoubleEndedBucketQueue(BucketQueue):
+    """
+    A bucket queue that can also remove the state with the highest value.
+
+    A second heap orders the buckets from the highest value. A bucket
+    emptied from one end stays in the heap of the other end until it gets
+    to its top, so both ends take O(log n).
+
+    >>> q = DoubleEndedBucketQueue()
+    >>> q.push('a', 2)
+    >>> q.push('b', 1)
+    >>> q.push('c', 2)
+    >>> q.drop_worst()
+    (2, 'a')
+    >>> q.drop_worst()
+    (2, 'c')
+    >>> q.push('d', 2)
+    >>> len(q), q.pop(), q.pop()
+    (2, (1, 'b'), (2, 'd'))
+    """
+
+    def __init__(self):
+        """Initialize an empty queue."""
+        BucketQueue.__init__(self)
+        self.worst = []
+        self.counter = itertools.count()
+
+    def push(self, state, value):
+        """Add a state to the queue."""
+        stack = self.buckets.get(value)
+        if stack is None:
+            stack = collections.deque()
+            self.buckets[value] = stack
+            count = next(self.counter)
+            heapq.heappush(self.heap, (value, count, stack))
+            heapq.heappush(self.worst, (_Reversed(value), count, stack))
+            self._compact()
+
+        stack.append(state)
+        self.size += 1
+
+    def pop(self):
+        """Remove the next state from the queue and get it with its value."""
+        heap, buckets = self.heap, self.buckets
+        value, _, stack = heap[0]
+        while buckets.get(value) is not stack:
+            heapq.heappop(heap)
+            value, _, stack = heap[0]
 
-    def pop(self, queue):
-        """Get the next state from the priority queue."""
-        value, stack = queue[0]
         element = stack.pop()
+        if not stack:
+            heapq.heappop(heap)
+            del buckets[value]
 
+        self.size -= 1
+        return value, element
+
+    def drop_worst(self):
+        """Remove a state with the highest value, the oldest among those."""
+        worst, buckets = self.worst, self.buckets
+        value, _, stack = worst[0]
+        while buckets.get(value.value) is not stack:
+            heapq.heappop(worst)
+            value, _, stack = worst[0]
+
+        element = stack.popleft()
         if not stack:
-            heapq.heappop(queue)
-            del self.value_states_dict[value]
+            heapq.heappop(worst)
+            del buckets[value.value]
+
+        self.size -= 1
+        return value.value, element
+
+    def _compact(self):
+        """Remove the emptied buckets once they fill half of a heap."""
+        limit = 2 * len(self.buckets) + 8
+        if len(self.heap) > limit or len(self.worst) > limit:
+            buckets = self.buckets
+            self.heap = [entry for entry in self.heap
+                         if buckets.get(entry[0]) is entry[2]]
+            self.worst = [entry for entry in self.worst
+                          if buckets.get(entry[0].value) is entry[2]]
+            heapq.heapify(self.heap)
+            heapq.heapify(self.worst)
+
+
+class _Reversed(object):
+    """A value ordered the other way around, for max heaps."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        """Wrap the value."""
+        self.value = value
+
+    def __lt__(self, other):
+        """Check whether the wrapped value is greater than the other one."""
+        return other.value < self.value
+
 
-        return element
+class DenseSeenSet:
+    """
+    A set of states whose keys are the integers in range(size).
+
+    Only one byte per possible key is stored, no state is kept alive.
+
+    >>> import problem
+    >>> seen = DenseSeenSet(3, lambda state: state.index)
+    >>> seen.add(problem.ShortestPathState(1, 0))
+    >>> problem.ShortestPathState(1, 5) in seen
+    True
+    >>> problem.ShortestPathState(2, 0) in seen
+    False
+    >>> len(seen)
+    1
+    """
+
+    def __init__(self, size, key):
+        """Initialize an empty set given the key function of the states."""
+        self.flags = bytearray(size)
+        self.key = key
+        self.size = 0
+
+    def __len__(self):
+        """Get the number of states in the set."""
+        return self.size
+
+    def __contains__(self, state):
+        """Check whether a state is in the set."""
+        return self.flags[self.key(state)] == 1
+
+    def add(self, state):
+        """Add a state to the set."""
+        key = self.key(state)
+        if not self.flags[key]:
+            self.flags[key] = 1
+            self.size += 1
+
+
+class KeySeenSet:
+    """
+    A set of states only storing their keys, their hashes by default.
+
+    >>> seen = KeySeenSet()
+    >>> seen.add("state")
+    >>> "state" in seen
+    True
+    """
+
+    def __init__(self, key=hash):
+        """Initialize an empty set given the key function of the states."""
+        self.keys = set()
+        self.key = key
+
+    def __len__(self):
+        """Get the number of states in the set."""
+        return len(self.keys)
+
+    def __contains__(self, state):
+        """Check whether a state is in the set."""
+        return self.key(state) in self.keys
+
+    def add(self, state):
+        """Add a state to the set."""
+        self.keys.add(self.key(state))
+
+
+class BoundedBestFirstSearch(BestFirstSearch):
+    """
+    A best first search keeping at most a given number of states queued.
+
+    Once the queue is full, the state with the highest value plus heuristic
+    is dropped for every new one, so memory and time per expansion stay
+    bounded. Dropped states are forgotten, so they are queued again when
+    reached later. The solution might not be optimal then.
+
+    >>> import problem
+    >>> spp = problem.ShortestPathProblem([
+    ...     [0, 1, 0, 0, 9], [0, 0, 1, 0, 0], [0, 0, 0, 1, 0],
+    ...     [0, 0, 0, 0, 1], [0, 0, 0, 0, 0]], 0, 4)
+    >>> BoundedBestFirstSearch(max_frontier=1).solve(spp)
+    {index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+
+    Node 2 is dropped when first reached, and has to be reached again:
+
+    >>> spp = problem.ShortestPathProblem([
+    ...     [0, 1, 5, 0], [0, 0, 10, 0], [0, 0, 0, 1], [0, 0, 0, 0]], 0, 3)
+    >>> BoundedBestFirstSearch(max_frontier=1).solve(spp)
+    {index: 3, value: 12, path: [0, 1, 2, 3]}
+    >>> BoundedBestFirstSearch(max_frontier=2).solve(spp)
+    {index: 3, value: 6, path: [0, 2, 3]}
+    """
+
+    optimal = False
+
+    def __init__(self, heuristic=None, max_frontier=10000):
+        """Initialize the search with an heuristic and a queue size."""
+        super(BoundedBestFirstSearch, self).__init__(heuristic)
+        self.max_frontier = max_frontier
+
+    def create_queue(self):
+        """Create a queue that can drop its worst state."""
+        return DoubleEndedBucketQueue()
+
+    def push(self, queue, state, value=None):
+        """Add a state to the queue, dropping the worst one if full."""
+        super(BoundedBestFirstSearch, self).push(queue, state, value)
+        if len(queue) > self.max_frontier:
+            return queue.drop_worst()[1]
+
+
+class BeamSearch(Search):
+    """
+    A breadth first search keeping the best states of every layer.
+
+    Only the given number of states with the lowest value plus heuristic
+    are expanded at each depth, so memory and time per layer are bounded by
+    the width times the branching factor. The solution might not be optimal,
+    or not found at all.
+
+    >>> import problem
+    >>> spp = problem.ShortestPathProblem([
+    ...     [0, 1, 0, 0, 9], [0, 0, 1, 0, 0], [0, 0, 0, 1, 0],
+    ...     [0, 0, 0, 0, 1], [0, 0, 0, 0, 0]], 0, 4)
+    >>> BeamSearch(width=1).solve(spp)
+    {index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+    """
+
+    def __init__(self, width=100, heuristic=None):
+        """Initialize the search with the width of the beam."""
+        self.width = width
+        self.heuristic = heuristic or ZeroHeuristic()
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """Get a solution to the problem."""
+        for result in self.steps(problem, initial_state, timeout, stats):
+            pass
+
+        return result
+
+    def steps(self, problem, initial_state=None, timeout=None, stats=None,
+              every=None):
+        """Run the search step by step, yielding PAUSE every few expansions."""
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        initial_state = initial_state or problem.initial_state()
+        heuristic = self.heuristic
+        if stats is not None:
+            heuristic = stats.heuristic(heuristic)
+
+        value = value_getter(initial_state)
+        _, add, _ = value_operations(value(initial_state))
+
+        seen = self.create_seen_set(problem)
+        self.add_to_seen(initial_state, seen, problem)
+        layer = [initial_state]
+        countdown = every or -1
+        searching = time.time()
+        try:
+            while layer:
+                branched_states = []
+                for state in layer:
+                    current = time.time()
+                    if current - start > timeout:
+                        raise TimeoutError()
+
+                    if problem.is_solution(state):
+                        if stats is not None:
+                            stats.solution(state)
+                        yield state
+                        return
+
+                    for branched_state in self.branch(problem, state):
+                        new = self.is_new(branched_state, seen, problem)
+                        if new:
+                            branched_states.append(branched_state)
+                        if stats is not None:
+                            stats.generate(branched_state, new)
+
+                    if stats is not None:
+                        stats.expand(state, len(branched_states), len(seen))
+
+                    countdown -= 1
+                    if not countdown:
+                        countdown = every
+                        yield PAUSE
+
+                # Keep the best states, in order, skipping duplicates
+                ranked = sorted(
+                    branched_states,
+                    key=lambda state: add(value(state), heuristic(state)))
+                layer = []
+                for state in ranked:
+                    if len(layer) == self.width:
+                        break
+
+                    if self.is_new(state, seen, problem):
+                        self.add_to_seen(state, seen, problem)
+                        layer.append(state)
+        finally:
+            if stats is not None:
+                stats.phase('search', searching)
+
+        yield None
 
 
 class IterativeDepthFirstSearch(BestFirstSearch):
@@ -230,24 +931,34 @@ class IterativeDepthFirstSearch(BestFirstSearch):
     or time runs out.
     """
 
+    optimal = False
+
     def sort_states(self, problem, states):
         """Sort branched states before insertion."""
         pass
 
     def pop(self, queue):
-        """Get the next state from the priority queue."""
-        value, stack = queue[0]
-        element = stack.pop()
+        """Get the next state from the priority queue, with its value."""
+        return queue.pop()
 
-        if not stack:
-            heapq.heappop(queue)
-            del self.value_states_dict[value]
+    def solve(self, problem, initial_state=None,
+              timeout=None, soft_timeout=None, stats=None):
+        """Get the best solution to the problem found by the soft timeout."""
+        best_solution = None
+        for best_solution in self.solve_iter(
+                problem, initial_state, timeout, stats, soft_timeout):
+            pass
 
-        return value, element
+        return best_solution
 
-    def solve(self, problem, initial_state=None,
-              timeout=None, soft_timeout=None):
-        """Get a solution to the problem."""
+    def solve_iter(self, problem, initial_state=None,
+                   timeout=None, stats=None, soft_timeout=None):
+        """
+        Yield every better solution to the problem as soon as it is found.
+
+        The search stops at the soft timeout once some solution was found,
+        and raises TimeoutError at the timeout if none was.
+        """
         if not timeout:
             timeout = float('inf')
 
@@ -257,17 +968,23 @@ class IterativeDepthFirstSearch(BestFirstSearch):
         start = time.time()
         initial_state = initial_state or problem.initial_state()
 
+        value = value_getter(initial_state)
+        less, _, _ = value_operations(value(initial_state))
+
         queue = self.create_queue()
-        seen = self.create_seen_set()
+        seen = self.create_seen_set(problem)
         self.push_if_new(queue, initial_state, seen, problem)
 
+        if stats is not None:
+            stats.phase('setup', start)
+
         best_solution = None
-        best_value = float('inf')
+        best_value = None
 
         while len(queue) > 0:
-            value, state = self.pop(queue)
+            estimate, state = self.pop(queue)
 
-            if value >= best_value:
+            if best_solution and not less(estimate, best_value):
                 break
 
             current = time.time()
@@ -280,19 +997,21 @@ class IterativeDepthFirstSearch(BestFirstSearch):
 
             remaining_time = timeout - ellapsed_time
             new_solution = self.run(
-                problem, state, queue, seen, remaining_time)
+                problem, state, queue, seen, remaining_time, stats)
 
             if new_solution:
-                new_value = new_solution.value
+                new_value = value(new_solution)
 
-                if new_value < best_value or not best_solution:
+                if not best_solution or less(new_value, best_value):
                     best_solution = new_solution
                     best_value = new_value
 
-        return best_solution
+                    if stats is not None:
+                        stats.solution(best_solution)
+                    yield best_solution
 
     def run(self, problem, initial_state, queue, seen,
-            timeout=None):
+            timeout=None, stats=None):
         """
         Get a temporary solution.
 
@@ -301,9 +1020,20 @@ class IterativeDepthFirstSearch(BestFirstSearch):
         if not timeout:
             timeout = float('inf')
 
+        heuristic = self.heuristic
+        if stats is not None:
+            heuristic = stats.heuristic(heuristic)
+
+        value = value_getter(initial_state)
+        _, add, _ = value_operations(value(initial_state))
+
         start = time.time()
         reached_solution = False
         current_state = initial_state
+
+        # States visited by this run, so it doesn't go around in circles
+        visited = self.create_seen_set()
+        self.add_to_seen(current_state, visited, problem)
         while True:
             current = time.time()
             if current - start > timeout:
@@ -314,8 +1044,14 @@ class IterativeDepthFirstSearch(BestFirstSearch):
                 break
 
             branched_states = self.branch(problem, current_state)
+            if stats is not None:
+                for state in branched_states:
+                    stats.generate(state, self.is_new(state, seen, problem) and
+                                   self.is_new(state, visited, problem))
+
             branched_states = filter(
-                lambda x: self.is_new(x, seen, problem),
+                lambda x: self.is_new(x, seen, problem) and
+                self.is_new(x, visited, problem),
                 branched_states
             )
 
@@ -328,59 +1064,860 @@ class IterativeDepthFirstSearch(BestFirstSearch):
                     new_states.append(state)
                     self.add_to_seen(state, new_seen, problem)
 
+            expanded_state = current_state
             if new_states:
                 new_states.reverse()
 
                 # Continue the run through the first state
                 current_state = new_states[0]
+                self.add_to_seen(current_state, visited, problem)
 
                 # Store the rest for another run
-                new_values = [state.value + self.heuristic(state)
+                new_values = [add(value(state), heuristic(state))
                               for state in new_states]
 
                 values_with_states = zip(new_values, new_states)
-                for value, state in values_with_states[1:]:
-                    self.push(queue, state, value=value)
+                for estimate, state in values_with_states[1:]:
+                    self.push(queue, state, value=estimate)
                     self.add_to_seen(state, seen, problem)
 
-            else:  # No way to continue this run
+            if stats is not None:
+                stats.expand(expanded_state, len(queue), len(seen))
+
+            if not new_states:  # No way to continue this run
                 break
 
+        if stats is not None:
+            stats.phase('run', start)
+
         return current_state if reached_solution else None
 
 
+class BidirectionalSearch(Search):
+    """
+    A search growing frontiers both from the start and from the goals.
+
+    The problem must implement goal_states and reverse_actions.
+    """
+
+    def branch_reverse(self, problem, state):
+        """Branch a state into its possible predecessors."""
+        actions = problem.reverse_actions(state)
+        return [self.generate(state, action) for action in actions]
+
+    def join(self, forward, backward):
+        """
+        Get the solution going through two meeting states.
+
+        The actions that led backwards from the goal are reversed and replayed
+        from the forward state.
+        """
+        state = forward
+        for action in reversed(backward._action_history):
+            state = self.generate(state, action.reverse())
+
+        return state
+
+
+class BidirectionalBreadthFirstSearch(BidirectionalSearch):
+    """
+    A breadth first search from both ends.
+
+    The smallest frontier is expanded one whole layer at a time, and the search
+    stops at the end of the first layer where both frontiers meet.
+    """
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """Get a solution to the problem."""
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        initial_state = initial_state or problem.initial_state()
+        if problem.is_solution(initial_state):
+            if stats is not None:
+                stats.solution(initial_state)
+            return initial_state
+
+        key = problem.state_key
+        forward = {key(initial_state): (0, initial_state)}
+        backward = dict((key(goal), (0, goal))
+                        for goal in problem.goal_states())
+        sides = [
+            (forward, backward, [initial_state], 0, self.branch),
+            (backward, forward, [goal for _, goal in backward.values()], 0,
+             self.branch_reverse),
+        ]
+
+        if stats is not None:
+            stats.phase('setup', start)
+
+        searching = time.time()
+        try:
+            while sides[0][2] and sides[1][2]:
+                current = time.time()
+                if current - start > timeout:
+                    raise TimeoutError()
+
+                side = 0 if len(sides[0][2]) <= len(sides[1][2]) else 1
+                seen, other, layer, depth, branch = sides[side]
+
+                best = None
+                next_layer = []
+                for state in layer:
+                    for branched_state in branch(problem, state):
+                        branched_key = key(branched_state)
+                        if stats is not None:
+                            stats.generate(branched_state,
+                                           branched_key not in seen)
+                        if branched_key in seen:
+                            continue
+
+                        seen[branched_key] = (depth + 1, branched_state)
+                        next_layer.append(branched_state)
+
+                        if branched_key in other:
+                            other_depth, other_state = other[branched_key]
+                            length = depth + 1 + other_depth
+                            if best is None or length < best[0]:
+                                best = (length, branched_state, other_state)
+
+                    if stats is not None:
+                        stats.expand(state, len(next_layer),
+                                     len(forward) + len(backward))
+
+                if best:
+                    _, state, other_state = best
+                    if side == 0:
+                        solution = self.join(state, other_state)
+                    else:
+                        solution = self.join(other_state, state)
+
+                    if stats is not None:
+                        stats.solution(solution)
+                    return solution
+
+                sides[side] = (seen, other, next_layer, depth + 1, branch)
+        finally:
+            if stats is not None:
+                stats.phase('search', searching)
+
+        return None
+
+
+class BidirectionalBestFirstSearch(BidirectionalSearch):
+    """
+    An optimal search from both ends (bidirectional A*).
+
+    Without heuristics this is bidirectional Dijkstra. The forward heuristic
+    estimates the cost to the goal and the reverse heuristic the cost from the
+    start; both must be consistent to ensure an optimal solution.
+    """
+
+    optimal = True
+
+    def __init__(self, heuristic=None, reverse_heuristic=None):
+        """Initialize the search with its forward and reverse heuristics."""
+        self.heuristic = heuristic or ZeroHeuristic()
+        self.reverse_heuristic = reverse_heuristic or ZeroHeuristic()
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """Get a solution to the problem."""
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        initial_state = initial_state or problem.initial_state()
+        if problem.is_solution(initial_state):
+            if stats is not None:
+                stats.solution(initial_state)
+            return initial_state
+
+        heuristic = self.heuristic
+        reverse_heuristic = self.reverse_heuristic
+        if stats is not None:
+            heuristic = stats.heuristic(heuristic)
+            reverse_heuristic = stats.heuristic(reverse_heuristic)
+
+        value = value_getter(initial_state)
+        less, add, _ = value_operations(value(initial_state))
+
+        key = problem.state_key
+        counter = itertools.count()
+        forward_queue = []
+        forward = {}
+        backward_queue = []
+        backward = {}
+        sides = [
+            (forward_queue, forward, backward, heuristic, self.branch),
+            (backward_queue, backward, forward, reverse_heuristic,
+             self.branch_reverse),
+        ]
+
+        for side, states in enumerate([[initial_state],
+                                       problem.goal_states()]):
+            queue, seen, _, heuristic, _ = sides[side]
+            for state in states:
+                seen[key(state)] = state
+                heapq.heappush(queue, (
+                    add(value(state), heuristic(state)), next(counter), state))
+
+        if stats is not None:
+            stats.phase('setup', start)
+
+        best_value = float('inf')
+        best = None
+        searching = time.time()
+        try:
+            while True:
+                current = time.time()
+                if current - start > timeout:
+                    raise TimeoutError()
+
+                # Lazy deletion: drop entries superseded by a cheaper path
+                for queue, seen, _, _, _ in sides:
+                    while queue and \
+                            seen[key(queue[0][2])] is not queue[0][2]:
+                        heapq.heappop(queue)
+
+                forward_top = forward_queue[0][0] if forward_queue else None
+                backward_top = backward_queue[0][0] if backward_queue \
+                    else None
+                if self.done(forward_top, backward_top, best_value):
+                    break
+
+                side = 0 if backward_top is None or \
+                    forward_top is not None and forward_top <= backward_top \
+                    else 1
+                queue, seen, other, heuristic, branch = sides[side]
+
+                _, _, state = heapq.heappop(queue)
+                for branched_state in branch(problem, state):
+                    branched_key = key(branched_state)
+                    known = seen.get(branched_key)
+                    new = known is None or \
+                        less(value(branched_state), value(known))
+                    if stats is not None:
+                        stats.generate(branched_state, new)
+                    if not new:
+                        continue
+
+                    seen[branched_key] = branched_state
+                    heapq.heappush(queue, (
+                        add(value(branched_state), heuristic(branched_state)),
+                        next(counter), branched_state))
+
+                    other_state = other.get(branched_key)
+                    if other_state is not None:
+                        total = add(value(branched_state), value(other_state))
+                        if total < best_value:
+                            best_value = total
+                            if side == 0:
+                                best = (branched_state, other_state)
+                            else:
+                                best = (other_state, branched_state)
+
+                if stats is not None:
+                    stats.expand(state, len(forward_queue) +
+                                 len(backward_queue),
+                                 len(forward) + len(backward))
+        finally:
+            if stats is not None:
+                stats.phase('search', searching)
+
+        if not best:
+            return None
+
+        solution = self.join(*best)
+        if stats is not None:
+            stats.solution(solution)
+        return solution
+
+    def done(self, forward_top, backward_top, best_value):
+        """
+        Check whether no better solution can be found.
+
+        The tops are the lowest value plus heuristic in each queue, or None
+        if the queue is empty, and best_value is the value of the best
+        solution found so far.
+        """
+        if forward_top is None or backward_top is None:
+            return True
+
+        return max(forward_top, backward_top) >= best_value
+
+
+class IterativeDeepeningAStar(Search):
+    """
+    An optimal search with memory linear in the solution depth (IDA*).
+
+    Depth first searches are repeated with an increasing bound on the value
+    plus the heuristic, keeping only the current path in memory.
+
+    The heuristic must be admissible to ensure an optimal solution.
+    """
+
+    optimal = True
+
+    def __init__(self, heuristic=None):
+        """Initialize the search with an heuristic, zero by default."""
+        self.heuristic = heuristic or ZeroHeuristic()
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """
+        Get a solution to the problem.
+
+        The time spent on each bound is recorded as a separate phase in
+        stats, if given.
+        """
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        initial_state = initial_state or problem.initial_state()
+        heuristic = self.heuristic
+        if stats is not None:
+            heuristic = stats.heuristic(heuristic)
+
+        value = value_getter(initial_state)
+        _, add, _ = value_operations(value(initial_state))
+
+        bound = add(value(initial_state), heuristic(initial_state))
+        while bound < float('inf'):
+            next_bound = float('inf')
+            iteration = time.time()
+
+            path = []
+            on_path = set()
+            stack = [iter([initial_state])]
+            try:
+                while stack:
+                    current = time.time()
+                    if current - start > timeout:
+                        raise TimeoutError()
+
+                    state = next(stack[-1], None)
+                    if state is None:
+                        stack.pop()
+                        if path:
+                            on_path.discard(path.pop())
+                        continue
+
+                    if stats is not None and path:
+                        stats.generate(state, state not in on_path)
+                    if state in on_path:
+                        continue
+
+                    estimate = add(value(state), heuristic(state))
+                    if estimate > bound:
+                        next_bound = min(next_bound, estimate)
+                        continue
+
+                    if problem.is_solution(state):
+                        if stats is not None:
+                            stats.solution(state)
+                        return state
+
+                    path.append(state)
+                    on_path.add(state)
+                    stack.append(iter(self.branch(problem, state)))
+                    if stats is not None:
+                        stats.expand(state, len(path), len(on_path))
+            finally:
+                if stats is not None:
+                    stats.phase('bound %s' % (bound,), iteration)
+
+            bound = next_bound
+
+        return None
+
+
+class SimplifiedMemoryBoundedAStar(Search):
+    """
+    A best first search keeping at most a given number of states (SMA*).
+
+    When memory is full, the leaf with the highest value plus heuristic (the
+    shallowest one on ties) is forgotten and its parent keeps that value, so
+    the subtree is only generated again once it is the most promising one.
+
+    Parents also remember the value of each forgotten child by key, so
+    children generated again start from it, and children that can't lead
+    to a solution aren't generated again at all.
+
+    All the successors of a state are generated at once, so the budget must
+    leave room for them besides the path to the solution: states whose path
+    and successors don't fit are dead ends. The solution is optimal if its
+    path fits in memory, and the best one reachable within the memory
+    otherwise.
+
+    >>> import problem
+    >>> spp = problem.SparseShortestPathProblem.from_edges([
+    ...     (7, 0, 8), (7, 5, 8), (7, 6, 3), (0, 1, 8), (6, 3, 4), (3, 8, 5),
+    ...     (7, 3, 7), (0, 7, 6), (3, 0, 7), (8, 3, 8), (6, 0, 5), (1, 5, 6)],
+    ...     7, 2, 9)
+    >>> SimplifiedMemoryBoundedAStar(max_states=5).solve(spp)
+    >>> SimplifiedMemoryBoundedAStar(max_states=1)
+    Traceback (most recent call last):
+    ...
+    ValueError: max_states must hold a state and one successor
+    """
+
+    def __init__(self, heuristic=None, max_states=100000):
+        """Initialize the search with an heuristic and a memory budget."""
+        if max_states < 2:
+            raise ValueError("max_states must hold a state and one successor")
+
+        self.heuristic = heuristic or ZeroHeuristic()
+        self.max_states = max_states
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """Get a solution to the problem."""
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        initial_state = initial_state or problem.initial_state()
+        heuristic = self.heuristic
+        if stats is not None:
+            heuristic = stats.heuristic(heuristic)
+
+        value = value_getter(initial_state)
+        less, add, _ = value_operations(value(initial_state))
+
+        # Nodes are queued again whenever they change, outdated entries are
+        # skipped by comparing versions. Open nodes are sorted by lowest value
+        # and deepest first, leaves by highest value and shallowest first.
+        counter = itertools.count()
+        open_nodes = []
+        leaves = []
+
+        def update(node):
+            node.version += 1
+            if node.open:
+                heapq.heappush(open_nodes, (
+                    node.value, -node.depth, next(counter), node.version,
+                    node))
+            if node.stored and not node.children:
+                heapq.heappush(leaves, (
+                    -node.value, node.depth, next(counter), node.version,
+                    node))
+
+        def valid(entries, is_valid):
+            while entries and not is_valid(entries[0]):
+                heapq.heappop(entries)
+            return entries[0][-1] if entries else None
+
+        def backup(node):
+            while node is not None:
+                lowest = min([child.value for child in node.children] +
+                             [node.forgotten])
+                if lowest == node.value:
+                    break
+
+                node.value = lowest
+                update(node)
+                node = node.parent
+
+        key = problem.state_key
+        max_depth = self.max_states - 1
+        root = _MemoryNode(
+            initial_state, None,
+            add(value(initial_state), heuristic(initial_state)))
+        update(root)
+        stored = 1
+
+        if stats is not None:
+            stats.phase('setup', start)
+
+        searching = time.time()
+        try:
+            while True:
+                current = time.time()
+                if current - start > timeout:
+                    raise TimeoutError()
+
+                node = valid(open_nodes, lambda entry: entry[-1].open and
+                             entry[-1].version == entry[-2])
+                if node is None or node.value == float('inf'):
+                    return None
+
+                if problem.is_solution(node.state):
+                    if stats is not None:
+                        stats.solution(node.state)
+                    return node.state
+
+                known = set(child.state for child in node.children)
+                remembered = node.remembered or {}
+                ancestors = set()
+                ancestor = node
+                while ancestor is not None:
+                    ancestors.add(ancestor.state)
+                    ancestor = ancestor.parent
+
+                # The cheapest new successor of each key
+                states = collections.OrderedDict()
+                for state in self.branch(problem, node.state):
+                    state_key = key(state)
+                    new = state not in known and state not in ancestors and \
+                        remembered.get(state_key) != float('inf')
+                    if new and state_key in states:
+                        new = less(value(state), value(states[state_key]))
+                    if stats is not None:
+                        stats.generate(state, new)
+                    if new:
+                        states[state_key] = state
+
+                # A node whose path and successors don't fit can't be
+                # expanded, so its value becomes infinite
+                if node.depth + 1 + len(node.children) + len(states) > \
+                        self.max_states:
+                    states.clear()
+
+                for state_key, state in states.iteritems():
+                    if node.depth + 1 >= max_depth and \
+                            not problem.is_solution(state):
+                        estimate = float('inf')
+                    else:
+                        estimate = max(node.value,
+                                       add(value(state), heuristic(state)),
+                                       remembered.get(state_key, node.value))
+
+                    child = _MemoryNode(state, node, estimate)
+                    node.children.append(child)
+                    update(child)
+                    stored += 1
+
+                node.open = False
+                node.forgotten = float('inf')
+                update(node)
+                backup(node)
+                if stats is not None:
+                    stats.expand(node.state, len(open_nodes), stored)
+
+                while stored > self.max_states:
+                    leaf = valid(leaves, lambda entry: entry[-1].stored and
+                                 not entry[-1].children and
+                                 entry[-1].version == entry[-2])
+                    heapq.heappop(leaves)
+
+                    parent = leaf.parent
+                    leaf.stored = leaf.open = False
+                    parent.children.remove(leaf)
+                    if parent.remembered is None:
+                        parent.remembered = {}
+                    parent.remembered[key(leaf.state)] = leaf.value
+                    if leaf.value < float('inf'):
+                        # Remember the subtree to generate it again if needed
+                        parent.forgotten = min(parent.forgotten, leaf.value)
+                        parent.open = True
+
+                    stored -= 1
+                    update(parent)
+                    backup(parent)
+        finally:
+            if stats is not None:
+                stats.phase('search', searching)
+
+
+class _MemoryNode(object):
+    """A node of the search tree kept by SimplifiedMemoryBoundedAStar."""
+
+    __slots__ = ('state', 'parent', 'depth', 'value', 'children',
+                 'forgotten', 'remembered', 'open', 'stored', 'version')
+
+    def __init__(self, state, parent, value):
+        """Initialize an open leaf node."""
+        self.state = state
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.value = value
+        self.children = []
+        self.forgotten = float('inf')
+        self.remembered = None
+        self.open = True
+        self.stored = True
+        self.version = 0
+
+
+class MultiObjectiveAStar(Search):
+    """
+    A best first search for every Pareto optimal solution (NAMOA*).
+
+    State values are tuples of costs, and a value dominates another if none
+    of its costs is higher. Every state keeps the values of the paths
+    reaching it that no other dominates, and paths whose value plus
+    heuristic is dominated by a solution found are dropped. Paths are
+    expanded in lexicographic order of their value plus heuristic, so every
+    solution found is Pareto optimal given an admissible heuristic, which
+    returns a tuple of costs too (or zero). Single costs count as tuples of
+    one cost.
+
+    >>> import problem
+    >>> spp = problem.ShortestPathProblem([
+    ...     [0, (1, 5), (3, 1), 0], [0, 0, 0, (1, 5)],
+    ...     [0, 0, 0, (3, 1)], [0, 0, 0, 0]], 0, 3)
+    >>> MultiObjectiveAStar().solve(
+    ...     spp, problem.ShortestPathState(0, (0, 0)))
+    [{index: 3, value: (2, 10), path: [0, 1, 3]}, \
+{index: 3, value: (6, 2), path: [0, 2, 3]}]
+    >>> spp = problem.ShortestPathProblem([
+    ...     [0, 1, 3, 0], [0, 0, 0, 1], [0, 0, 0, 3], [0, 0, 0, 0]], 0, 3)
+    >>> MultiObjectiveAStar().solve(spp)
+    [{index: 3, value: 2, path: [0, 1, 3]}]
+    """
+
+    optimal = True
+
+    def __init__(self, heuristic=None):
+        """Initialize the search with an heuristic, zero by default."""
+        self.heuristic = heuristic or ZeroHeuristic()
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """
+        Get the Pareto optimal solutions to the problem.
+
+        The initial state must have a value with as many costs as the
+        others, like a tuple of zeros.
+        """
+        return list(self.solve_iter(problem, initial_state, timeout, stats))
+
+    def solve_iter(self, problem, initial_state=None, timeout=None,
+                   stats=None):
+        """Yield the Pareto optimal solutions as they are found."""
+        if not timeout:
+            timeout = float('inf')
+
+        start = time.time()
+        initial_state = initial_state or problem.initial_state()
+        heuristic = self.heuristic
+        if stats is not None:
+            heuristic = stats.heuristic(heuristic)
+
+        def costs(value):
+            return tuple(value) if isinstance(value, (tuple, list)) \
+                else (value,)
+
+        def estimate(state, cost):
+            h = heuristic(state)
+            return tuple(a + b for a, b in zip(cost, costs(h))) if h else cost
+
+        value = value_getter(initial_state)
+        key = problem.state_key
+        counter = itertools.count()
+        solutions = ParetoSet()
+        labels = {}
+        queue = []
+
+        def offer(state):
+            cost = costs(value(state))
+            estimated = estimate(state, cost)
+            if solutions.dominates(estimated):
+                return False
+
+            # Entries of the paths dropped stay queued, marked as removed
+            entry = [estimated, next(counter), state]
+            state_labels = labels.setdefault(key(state), ParetoSet())
+            dropped = state_labels.add(cost, entry)
+            if dropped is None:
+                return False
+
+            for other in dropped:
+                other[-1] = None
+            heapq.heappush(queue, entry)
+            return True
+
+        offer(initial_state)
+        searching = time.time()
+        try:
+            while queue:
+                current = time.time()
+                if current - start > timeout:
+                    raise TimeoutError()
+
+                entry = heapq.heappop(queue)
+                estimated, _, state = entry
+                if state is None:
+                    continue
+
+                # The path can't be dropped anymore once expanded
+                entry[-1] = None
+                if solutions.dominates(estimated):
+                    continue
+
+                if problem.is_solution(state):
+                    solutions.add(costs(value(state)), state)
+                    if stats is not None:
+                        stats.solution(state)
+                    yield state
+                    continue
+
+                for branched_state in self.branch(problem, state):
+                    new = offer(branched_state)
+                    if stats is not None:
+                        stats.generate(branched_state, new)
+
+                if stats is not None:
+                    stats.expand(state, len(queue), len(labels))
+        finally:
+            if stats is not None:
+                stats.phase('search', searching)
+
+
+class ParetoSet:
+    """
+    Vectors that don't dominate one another, each with an item.
+
+    A vector dominates another if none of its components is greater. Pairs
+    are kept sorted by first component, so checks and insertions take a
+    binary search; longer vectors are compared with every stored one.
+
+    >>> front = ParetoSet()
+    >>> front.add((2, 5), 'a'), front.add((4, 1), 'b'), front.add((3, 6))
+    ([], [], None)
+    >>> front.add((1, 5), 'c')
+    ['a']
+    >>> front.dominates((5, 1)), front.dominates((3, 4))
+    (True, False)
+    >>> list(front)
+    [((1, 5), 'c'), ((4, 1), 'b')]
+    """
+
+    def __init__(self):
+        """Initialize an empty set."""
+        self.vectors = []
+        self.items = []
+        self.firsts = []
+
+    def __len__(self):
+        """Get the number of vectors stored."""
+        return len(self.vectors)
+
+    def __iter__(self):
+        """Iterate over the (vector, item) pairs."""
+        return iter(zip(self.vectors, self.items))
+
+    def dominates(self, vector):
+        """Check whether some vector stored dominates or equals a vector."""
+        if len(vector) == 2:
+            index = bisect.bisect_right(self.firsts, vector[0]) - 1
+            return index >= 0 and self.vectors[index][1] <= vector[1]
+
+        for other in self.vectors:
+            if all(a <= b for a, b in zip(other, vector)):
+                return True
+
+        return False
+
+    def add(self, vector, item=None):
+        """
+        Add a vector unless some vector stored dominates or equals it.
+
+        Return None if the vector wasn't added, and otherwise the items of
+        the vectors removed because the new one dominates them.
+        """
+        if self.dominates(vector):
+            return None
+
+        if len(vector) == 2:
+            # Second components decrease as first components increase, so
+            # the vectors dominated follow the insertion point
+            begin = end = bisect.bisect_left(self.firsts, vector[0])
+            while end < len(self.vectors) and \
+                    self.vectors[end][1] >= vector[1]:
+                end += 1
+
+            dropped = self.items[begin:end]
+            self.vectors[begin:end] = [vector]
+            self.items[begin:end] = [item]
+            self.firsts[begin:end] = [vector[0]]
+            return dropped
+
+        dropped = []
+        kept = []
+        for other, other_item in zip(self.vectors, self.items):
+            if all(a <= b for a, b in zip(vector, other)):
+                dropped.append(other_item)
+            else:
+                kept.append((other, other_item))
+
+        kept.append((vector, item))
+        self.vectors = [other for other, _ in kept]
+        self.items = [other_item for _, other_item in kept]
+        return dropped
+
+
 class GreedySearch(Search):
-    """A greedy search."""
+    """
+    A greedy search, moving to better neighbours while there are some.
+
+    It moves to the best neighbour (steepest descent) by default, or to the
+    first neighbour better than the current state, only building the
+    neighbours tried.
+
+    >>> import problem
+    >>> spp = problem.ShortestPathProblem([
+    ...     [0, -1, -3], [0, 0, -5], [0, 0, 0]], 0, 2)
+    >>> GreedySearch().solve(spp)
+    {index: 2, value: -3, path: [0, 2]}
+    >>> GreedySearch(first_improvement=True).solve(spp)
+    {index: 2, value: -6, path: [0, 1, 2]}
+    """
 
-    def solve(self, problem, initial_state=None, timeout=None):
+    def __init__(self, first_improvement=False):
+        """Initialize the search, choosing how to pick the next state."""
+        self.first_improvement = first_improvement
+
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
         """Get a solution to the problem."""
         if not timeout:
             timeout = float('inf')
 
         start = time.time()
         current_state = initial_state or problem.initial_state()
+        value = value_getter(current_state)
+        less, _, _ = value_operations(value(current_state))
 
         best_solution = current_state
-        best_value = current_state.value
+        best_value = value(current_state)
 
         while current_state:
             current = time.time()
             if current - start > timeout:
                 break
 
-            neighbours = self.branch(problem, current_state)
-            if neighbours:
-                next_state = utils.argmin_random_tie(
-                    neighbours,
-                    key=lambda state: state.value
-                )
-                if next_state and next_state.value >= best_value:
-                    next_state = None
+            if self.first_improvement:
+                next_state = None
+                for state in self.iter_branch(problem, current_state):
+                    if stats is not None:
+                        stats.generate(state)
+                    if less(value(state), best_value):
+                        next_state = state
+                        break
             else:
+                neighbours = self.branch(problem, current_state)
+                if stats is not None:
+                    for state in neighbours:
+                        stats.generate(state)
+
                 next_state = None
+                if neighbours:
+                    next_state = utils.argmin_random_tie(neighbours, key=value)
+                    if not less(value(next_state), best_value):
+                        next_state = None
+
+            if stats is not None:
+                stats.expand(current_state)
+
+            if next_state is not None:
+                best_solution = next_state
+                best_value = value(next_state)
 
             current_state = next_state
 
+        if stats is not None:
+            stats.phase('search', start)
+            stats.solution(best_solution)
+
         return best_solution
 
 
@@ -391,16 +1928,32 @@ class SimulatedAnnealing(Search):
         """Initialize the Simulated Annealing with a schedule function."""
         self.schedule = schedule
 
-    def solve(self, problem, initial_state=None, timeout=None):
-        """Get a solution to the problem."""
+    def solve(self, problem, initial_state=None, timeout=None, stats=None):
+        """Get the best state found by the end of the schedule."""
+        best_solution = None
+        for best_solution in self.solve_iter(
+                problem, initial_state, timeout, stats):
+            pass
+
+        return best_solution
+
+    def solve_iter(self, problem, initial_state=None, timeout=None,
+                   stats=None):
+        """Yield the initial state, then every better state found."""
         if not timeout:
             timeout = float('inf')
 
         start = time.time()
         current_state = initial_state or problem.initial_state()
 
+        value = value_getter(current_state)
+        less, _, diff = value_operations(value(current_state))
+
         best_solution = current_state
-        best_value = current_state.value
+        best_value = value(current_state)
+        if stats is not None:
+            stats.solution(best_solution)
+        yield best_solution
 
         for _t in xrange(sys.maxsize):
             st = self.schedule(_t)
@@ -408,19 +1961,28 @@ class SimulatedAnnealing(Search):
             if current - start > timeout or st == 0:
                 break
 
-            neighbours = self.branch(problem, current_state)
-            if not neighbours:
+            # Only the neighbour tried is built
+            next_state = self.random_branch(problem, current_state)
+            if next_state is None:
                 break
 
-            next_state = random.choice(neighbours)
-            delta_e = next_state.value.diff(current_state.value)
+            if stats is not None:
+                stats.generate(next_state)
+                stats.expand(current_state)
+
+            delta_e = diff(value(next_state), value(current_state))
             if delta_e <= 0 or utils.probability(math.exp(-delta_e / st)):
                 current_state = next_state
-                if current_state.value < best_value:
+                if less(value(current_state), best_value):
                     best_solution = current_state
-                    best_value = current_state.value
+                    best_value = value(current_state)
 
-        return best_solution
+                    if stats is not None:
+                        stats.solution(best_solution)
+                    yield best_solution
+
+        if stats is not None:
+            stats.phase('search', start)
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -449,6 +2011,94 @@ class ZeroHeuristic(Heuristic):
         return 0
 
 
+class CachedHeuristic(Heuristic):
+    """
+    An heuristic remembering the values of the states it last evaluated.
+
+    States are matched by hash and equality, or by the given key function,
+    like problem.state_key, which avoids keeping the states themselves (and
+    their search trees) alive. Once maxsize values are stored, the least
+    recently used one is forgotten. The cache is kept between solves, so an
+    instance can be shared by searches over the same problem, including
+    searches running in threads. Processes get their own copy.
+
+    >>> calls = []
+    >>> h = CachedHeuristic(lambda state: calls.append(state) or 2 * state,
+    ...                     maxsize=2)
+    >>> h(1), h(2), h(1), h(3), h(2)
+    (2, 4, 2, 6, 4)
+    >>> calls
+    [1, 2, 3, 2]
+    >>> h.hits, h.misses
+    (1, 4)
+    >>> h.clear()
+    >>> len(h.cache), h.hits
+    (0, 0)
+    >>> h = CachedHeuristic(lambda state: 2 * state, maxsize=0)
+    >>> h(1), h(1), len(h.cache), h.misses
+    (2, 2, 0, 2)
+    """
+
+    def __init__(self, heuristic, maxsize=100000, key=None):
+        """
+        Wrap an heuristic, keeping up to maxsize values (or all if None).
+
+        A maxsize of 0 stores nothing, only counting the calls.
+        """
+        self.heuristic = heuristic
+        self.maxsize = maxsize
+        self.key = key
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, state):
+        """Evaluate a state, or get its value from the cache."""
+        key = state if self.key is None else self.key(state)
+        cache = self.cache
+        with self.lock:
+            if key in cache:
+                value = cache.pop(key)
+                cache[key] = value
+                self.hits += 1
+                return value
+
+            self.misses += 1
+
+        # Other threads may use the cache meanwhile
+        value = self.heuristic(state)
+        if self.maxsize == 0:
+            return value
+
+        with self.lock:
+            cache.pop(key, None)
+            if self.maxsize is not None and len(cache) >= self.maxsize:
+                cache.popitem(last=False)
+
+            cache[key] = value
+
+        return value
+
+    def clear(self):
+        """Forget every value stored and reset the counters."""
+        with self.lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __getstate__(self):
+        """Get the attributes to pickle, without the lock."""
+        attributes = self.__dict__.copy()
+        del attributes['lock']
+        return attributes
+
+    def __setstate__(self, attributes):
+        """Restore the pickled attributes, with a new lock."""
+        self.__dict__.update(attributes)
+        self.lock = threading.Lock()
+
+
 def unit_test():
     """Test the module."""
     import doctest
@@ -21,8 +21,11 @@ Testing BFS, DFS, A*, IDFS on a ShortestPathProblem.
 >>> a = search.BestFirstSearch()
 >>> idfs = search.IterativeDepthFirstSearch()
 
->>> bfs.solve(spp)
+>>> solution = bfs.solve(spp)
+>>> solution
 {index: 0, value: 2, path: [4, 1, 0]}
+>>> [(action.start, action.end) for action in solution._action_history]
+[(4, 1), (1, 0)]
 
 >>> dfs.solve(spp)
 {index: 0, value: 3, path: [4, 3, 2, 0]}
@@ -33,8 +36,184 @@ Testing BFS, DFS, A*, IDFS on a ShortestPathProblem.
 
 >>> idfs.solve(spp)
 {index: 0, value: 2, path: [4, 1, 0]}
+
+Anytime searches yield every better solution as soon as they find it.
+
+>>> for solution in idfs.solve_iter(spp):
+...     print solution
+{index: 0, value: 3, path: [4, 3, 2, 0]}
+{index: 0, value: 2, path: [4, 1, 0]}
+
+They take the same positional arguments as solve, stats coming fourth.
+
+>>> stats = search.SearchStats()
+>>> list(idfs.solve_iter(spp, None, None, stats))[-1], stats.expanded > 0
+({index: 0, value: 2, path: [4, 1, 0]}, True)
+
+The same graph in compressed sparse row form.
+
+>>> edges = [(row, column)
+...          for row, values in enumerate(adjacency_matrix)
+...          for column, value in enumerate(values) if value]
+>>> sparse = problem.SparseShortestPathProblem.from_edges(edges, start, end)
+
+>>> bfs.solve(sparse)
+{index: 0, value: 2, path: [4, 1, 0]}
+
+>>> dfs.solve(sparse)
+{index: 0, value: 3, path: [4, 3, 2, 0]}
+
+>>> a.solve(sparse)
+{index: 0, value: 2, path: [4, 1, 0]}
+
+>>> idfs.solve(sparse)
+{index: 0, value: 2, path: [4, 1, 0]}
+
+Searches keep no state between calls, so they can be reused after a timeout
+or shared between threads.
+
+>>> a.solve(sparse, timeout=-1)
+Traceback (most recent call last):
+    ...
+TimeoutError
+>>> a.solve(sparse)
+{index: 0, value: 2, path: [4, 1, 0]}
+
+>>> from multiprocessing.pool import ThreadPool
+>>> ThreadPool(4).map(a.solve, [spp, sparse] * 4)[-2:]
+[{index: 0, value: 2, path: [4, 1, 0]}, {index: 0, value: 2, path: [4, 1, 0]}]
+
+Matrix entries are the costs of the edges; A* reopens states reached later
+through a cheaper path.
+
+>>> weighted_matrix = [
+...     [0, 1, 0, 0, 9],
+...     [0, 0, 1, 0, 0],
+...     [0, 0, 0, 1, 0],
+...     [0, 0, 0, 0, 1],
+...     [0, 0, 0, 0, 0]]
+>>> weighted_spp = problem.ShortestPathProblem(weighted_matrix, 0, 4)
+
+>>> search.BestFirstSearch().solve(weighted_spp)
+{index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+
+>>> search.BreadthFirstSearch().solve(weighted_spp)
+{index: 4, value: 9, path: [0, 4]}
+
+Every search collects counters and timings into an optional SearchStats, and
+calls its hooks on each expanded or generated state and on the solution.
+
+>>> expanded = []
+>>> stats = search.SearchStats(on_expand=lambda state: expanded.append(
+...     state.index))
+>>> search.BestFirstSearch().solve(weighted_spp, stats=stats)
+{index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+>>> stats
+SearchStats(expanded=4, generated=5, duplicates=0)
+>>> expanded
+[0, 1, 2, 3]
+>>> stats.peak_frontier, stats.heuristic_calls
+(2, 6)
+>>> sorted(stats.phases)
+['search', 'setup']
+
+IDA* and SMA* find optimal solutions with bounded memory.
+
+>>> search.IterativeDeepeningAStar().solve(weighted_spp)
+{index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+
+>>> search.SimplifiedMemoryBoundedAStar(max_states=6).solve(weighted_spp)
+{index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+
+With tuple costs, MultiObjectiveAStar finds every Pareto optimal path, here
+trading distance against time.
+
+>>> routes = problem.ShortestPathProblem([
+...     [0, (1, 4), (4, 1), (3, 3)],
+...     [0, 0, 0, (1, 4)],
+...     [0, 0, 0, (4, 1)],
+...     [0, 0, 0, 0]], 0, 3)
+>>> for solution in search.MultiObjectiveAStar().solve(
+...         routes, problem.ShortestPathState(0, (0, 0))):
+...     print solution
+{index: 3, value: (2, 8), path: [0, 1, 3]}
+{index: 3, value: (3, 3), path: [0, 3]}
+{index: 3, value: (8, 2), path: [0, 2, 3]}
+
+Bidirectional searches grow frontiers from both start and end.
+
+>>> search.BidirectionalBreadthFirstSearch().solve(spp)
+{index: 0, value: 2, path: [4, 1, 0]}
+
+>>> search.BidirectionalBestFirstSearch().solve(sparse)
+{index: 0, value: 2, path: [4, 1, 0]}
+
+>>> weighted = problem.SparseShortestPathProblem.from_edges(
+...     [(0, 1, 1.0), (1, 2, 1.0), (2, 3, 1.0), (0, 3, 5.0), (3, 4, 1.0)],
+...     0, 4)
+>>> search.BidirectionalBestFirstSearch().solve(weighted)
+{index: 4, value: 4.0, path: [0, 1, 2, 3, 4]}
+
+Searches also run on an event loop. A* runs on the loop itself through its
+steps, breadth first search in the default executor of the loop.
+
+>>> try:
+...     import asyncio
+... except ImportError:
+...     import trollius as asyncio
+>>> loop = asyncio.new_event_loop()
+>>> loop.run_until_complete(a.solve_async(spp, every=1, loop=loop))
+{index: 0, value: 2, path: [4, 1, 0]}
+>>> loop.run_until_complete(bfs.solve_async(spp, loop=loop))
+{index: 0, value: 2, path: [4, 1, 0]}
+
+The timeout is raised through the future, wherever the search runs.
+
+>>> import generators
+>>> grid = generators.grid(30, 30, seed=0)
+>>> loop.run_until_complete(
+...     a.solve_async(grid, timeout=1e-6, every=10, loop=loop))
+Traceback (most recent call last):
+...
+TimeoutError
+>>> loop.run_until_complete(
+...     bfs.solve_async(grid, timeout=1e-6, loop=loop))
+Traceback (most recent call last):
+...
+TimeoutError
+>>> loop.close()
 """
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Examples needing NumPy, only tested if it's installed
+__test__ = {}
+if numpy is not None:
+    __test__['vectorized'] = """
+    The level synchronous breadth first search, on both graph forms.
+
+    >>> import graph
+    >>> import problem
+    >>> spp = problem.ShortestPathProblem([
+    ...     [0, 1, 0, 0, 1],
+    ...     [1, 0, 0, 0, 1],
+    ...     [1, 0, 0, 0, 0],
+    ...     [0, 0, 1, 0, 0],
+    ...     [0, 1, 0, 1, 0]], 4, 0)
+    >>> sparse = problem.SparseShortestPathProblem.from_edges(
+    ...     [(0, 1), (0, 4), (1, 0), (1, 4), (2, 0), (3, 2), (4, 1), (4, 3)],
+    ...     4, 0)
+    >>> vbfs = graph.VectorizedBreadthFirstSearch()
+    >>> vbfs.solve(spp)
+    {index: 0, value: 2, path: [4, 1, 0]}
+
+    >>> vbfs.solve(sparse)
+    {index: 0, value: 2, path: [4, 1, 0]}
+    """
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -3,6 +3,9 @@
 """Contains the base class for transformating one problem to another."""
 import abc
 import six
+import heapq
+import array
+from problem import SparseShortestPathProblem
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -18,3 +21,211 @@ class Transformation:
     def revert(self, problem):
         """Revert the transformation on the problem's output."""
         raise NotImplementedError()
+
+
+class ContractionHierarchies(Transformation):
+    """
+    Contraction hierarchies over the graph of a ShortestPathProblem.
+
+    Nodes are contracted one at a time in order of importance, adding a
+    shortcut edge between two of their neighbours whenever the path through
+    the contracted node is the only shortest one. The node ranks are the
+    contraction order. The problem applied gives the upward graph: its
+    successors and predecessors only lead to nodes of higher rank, so
+    graph.ContractionHierarchyQuery settles very few nodes. The solution
+    reverted unpacks the shortcuts into a state of the original problem.
+
+    The hierarchy is kept for the last graph seen, so applying the
+    transformation to another problem over the same graph, with other start
+    and end nodes, is immediate. It is built again once the graph changes.
+
+    >>> import graph, problem
+    >>> matrix = [[0, 1, 0, 0, 9], [0, 0, 1, 0, 0], [0, 0, 0, 1, 0],
+    ...           [0, 0, 0, 0, 1], [0, 0, 0, 0, 0]]
+    >>> spp = problem.ShortestPathProblem(matrix, 0, 4)
+    >>> ch = ContractionHierarchies()
+    >>> upward = ch.apply(spp)
+    >>> solution = graph.ContractionHierarchyQuery().solve(upward)
+    >>> solution.value.value
+    4.0
+    >>> ch.revert(solution)
+    {index: 4, value: 4, path: [0, 1, 2, 3, 4]}
+    """
+
+    def __init__(self, witness_limit=100):
+        """
+        Initialize the transformation.
+
+        Witness searches looking for paths that avoid the node being
+        contracted settle at most witness_limit nodes, adding a shortcut when
+        none is found in time.
+        """
+        self.witness_limit = witness_limit
+        self.problem = None
+        self._graph = None
+        self._version = None
+        self._hierarchy = None
+
+    def apply(self, problem):
+        """Get the problem over the upward graph of the hierarchy."""
+        graph = problem.graph()
+        if self._graph is None or len(graph) != len(self._graph) or \
+                any(a is not b for a, b in zip(graph, self._graph)) or \
+                problem.version != self._version:
+            self._hierarchy = self.contract(problem)
+            self._graph = graph
+            self._version = problem.version
+
+        self.problem = problem
+        upward, downward, rank, via = self._hierarchy
+        return ContractionHierarchyProblem(
+            upward, downward, rank, via, problem.start, problem.end)
+
+    def revert(self, state):
+        """Get the state of the original problem following the same path."""
+        _, _, _, via = self._hierarchy
+        path = [state.path[0]]
+        for end in state.path[1:]:
+            # Replace every shortcut by the two edges it stands for
+            stack = [end]
+            while stack:
+                middle = via.get((path[-1], stack[-1]))
+                if middle is None:
+                    path.append(stack.pop())
+                else:
+                    stack.append(middle)
+
+        return self.problem.path_state(path)
+
+    def contract(self, problem):
+        """
+        Build the hierarchy of the graph of a problem.
+
+        Return the upward edges and the downward edges, both as reversed
+        graphs going up, the rank of every node and the middle node of every
+        shortcut.
+        """
+        size = problem.num_nodes
+        outgoing = [{} for _ in xrange(size)]
+        incoming = [{} for _ in xrange(size)]
+        for start in xrange(size):
+            for end, cost in problem.successors(start):
+                if end != start and cost < outgoing[start].get(
+                        end, float('inf')):
+                    outgoing[start][end] = incoming[end][start] = cost
+
+        via = {}
+        up = []
+        down = []
+        rank = array.array('l', [0]) * size
+        contracted = [0] * size
+
+        def shortcuts(node):
+            found = []
+            for start, start_cost in incoming[node].iteritems():
+                ends = [(end, start_cost + cost)
+                        for end, cost in outgoing[node].iteritems()
+                        if end != start]
+                if not ends:
+                    continue
+
+                limit = max(cost for _, cost in ends)
+                distances = self._witness(outgoing, start, node, limit)
+                found.extend((start, end, cost) for end, cost in ends
+                             if distances.get(end, float('inf')) > cost)
+
+            return found
+
+        def priority(node):
+            # Edge difference, plus the neighbours already contracted to
+            # spread the contraction uniformly over the graph
+            return len(shortcuts(node)) - len(incoming[node]) - \
+                len(outgoing[node]) + contracted[node]
+
+        queue = [(priority(node), node) for node in xrange(size)]
+        heapq.heapify(queue)
+        order = 0
+        while queue:
+            _, node = heapq.heappop(queue)
+
+            # Lazy updates: priorities only grow as neighbours go away
+            current = priority(node)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, node))
+                continue
+
+            rank[node] = order
+            order += 1
+
+            new_edges = shortcuts(node)
+            for end, cost in outgoing[node].iteritems():
+                up.append((node, end, cost))
+                del incoming[end][node]
+                contracted[end] += 1
+
+            for start, cost in incoming[node].iteritems():
+                down.append((node, start, cost))
+                del outgoing[start][node]
+                contracted[start] += 1
+
+            outgoing[node] = incoming[node] = None
+            for start, end, cost in new_edges:
+                if cost < outgoing[start].get(end, float('inf')):
+                    outgoing[start][end] = incoming[end][start] = cost
+                    via[start, end] = node
+
+        upward = SparseShortestPathProblem.from_edges(
+            up, None, None, size)
+        downward = SparseShortestPathProblem.from_edges(
+            down, None, None, size)
+        return upward, downward, rank, via
+
+    def _witness(self, outgoing, source, avoided, limit):
+        """Get the distances from a source up to a limit, avoiding a node."""
+        distances = {source: 0}
+        queue = [(0, source)]
+        settled = 0
+        while queue and settled < self.witness_limit:
+            distance, node = heapq.heappop(queue)
+            if distance > distances[node]:
+                continue
+
+            settled += 1
+            if distance > limit:
+                break
+
+            for other, cost in outgoing[node].iteritems():
+                new_distance = distance + cost
+                if other != avoided and \
+                        new_distance < distances.get(other, float('inf')):
+                    distances[other] = new_distance
+                    heapq.heappush(queue, (new_distance, other))
+
+        return distances
+
+
+class ContractionHierarchyProblem(SparseShortestPathProblem):
+    """
+    A shortest path problem over the upward graph of a hierarchy.
+
+    The successors of a node are its neighbours of higher rank, and so are
+    its predecessors, taken from the downward edges reversed.
+    """
+
+    def __init__(self, upward, downward, rank, via, node_start, node_end):
+        """Initialize the problem from the graphs of the hierarchy."""
+        super(ContractionHierarchyProblem, self).__init__(
+            upward.offsets, upward.neighbours, node_start, node_end,
+            upward.weights)
+        self._transpose = downward
+        self.rank = rank
+        self.via = via
+
+
+def unit_test():
+    """Test the module."""
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    unit_test()
@@ -47,6 +47,22 @@ def exp_schedule(k=20, lam=0.005, limit=100):
     """One possible schedule function for simulated annealing."""
     return lambda t: (k * math.exp(-lam * t) if t < limit else 0)
 
+
+def schedule_ladder(schedule, n, limit=100):
+    """
+    Return n temperatures of a schedule, evenly spread over its first steps.
+
+    The temperatures go from the hottest one, at step 0, to the one at step
+    limit - 1.
+
+    >>> [round(t, 2) for t in schedule_ladder(exp_schedule(lam=0.05), 3)]
+    [20.0, 1.68, 0.14]
+    """
+    if n == 1:
+        return [schedule(0)]
+
+    return [schedule(i * (limit - 1.0) / (n - 1)) for i in xrange(n)]
+
 # ______________________________________________________________________________
 
 